@@ -0,0 +1,89 @@
+"""Opt-in on-disk cache of answers for repeated questions against an unchanged workspace."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from typing import Any, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "ask-chatbot")
+
+
+def workspace_fingerprint(workspace_root: str) -> Optional[str]:
+    """Digest of (path, mtime, size) for every git-tracked file; None outside a git checkout."""
+    try:
+        result = subprocess.run(
+            ["git", "ls-files", "-z"],
+            cwd=workspace_root,
+            capture_output=True,
+            timeout=10,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    for rel in result.stdout.split(b"\0"):
+        if not rel:
+            continue
+        try:
+            st = os.stat(os.path.join(os.fsencode(workspace_root), rel))
+        except OSError:
+            continue  # deleted but still in the index
+        digest.update(b"%s\0%d\0%d\0" % (rel, st.st_mtime_ns, st.st_size))
+    return digest.hexdigest()
+
+
+def config_fingerprint(config_dir: str) -> str:
+    """Digest of every file's bytes under config_dir."""
+    digest = hashlib.blake2b(digest_size=16)
+    for root, dirs, files in os.walk(config_dir):
+        dirs.sort()
+        for fname in sorted(files):
+            path = os.path.join(root, fname)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                continue
+            digest.update(os.path.relpath(path, config_dir).encode("utf-8") + b"\0")
+            digest.update(hashlib.blake2b(data, digest_size=16).digest())
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """Answers stored as JSON files named by a digest of everything that shaped them."""
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self.directory = directory or default_cache_dir()
+
+    @staticmethod
+    def key(question: str, parts: Sequence[Any]) -> str:
+        payload = json.dumps([question, *parts], sort_keys=True, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, f"{key}.json"), "rb") as f:
+                return json.loads(f.read()).get("answer")
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, answer: str) -> None:
+        path = os.path.join(self.directory, f"{key}.json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"answer": answer}, f)
+            os.replace(tmp, path)
+        except OSError as exc:
+            logger.warning("Could not write answer cache %s: %s", path, exc)
@@ -0,0 +1,12 @@
+"""Config file loading."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def parse_yaml(raw: bytes) -> Any:
+    import yaml  # deferred: modules that never read YAML don't pay for PyYAML
+
+    # libyaml's C loader is several times faster than the pure-Python SafeLoader.
+    return yaml.load(raw, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
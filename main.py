@@ -1,6 +1,9 @@
 # main.py - Entry point for the Help Chatbot CLI
 import argparse
+import functools
+import logging
 import os
+import re
 import sys
 
 # Enable agent_engine to use Anthropic/Haiku
@@ -8,8 +11,8 @@ os.environ['AGENT_ENGINE_USE_ANTHROPIC'] = '1'
 # Default Ollama host if not provided
 os.environ.setdefault("OLLAMA_HOST", "http://127.0.0.1:11434")
 
-from anthropic import Anthropic
-from tools import search_codebase_tool
+# anthropic, tools (numpy, yaml) and ollama_client are imported where they are used,
+# so `ask --help` and argument errors don't pay for them.
 
 MODEL_PROFILES = {
     "haiku": {"backend": "anthropic", "model": "claude-3-5-haiku-20241022"},
@@ -17,6 +20,15 @@ MODEL_PROFILES = {
 }
 DEFAULT_MODEL = "haiku"
 
+# One pass over the question: tokens are split on whitespace, commas and colons.
+# A token containing "/" contributes its first path segment (group 1); a token
+# ending in a known file suffix contributes itself (group 2).
+_FOCUS_RE = re.compile(
+    r"(?<![^\s,:])"
+    r"(?:([^\s,:/]*)/[^\s,:]*"
+    r"|([^\s,:/]*\.(?:py|md|yaml|yml|json|txt))(?![^\s,:]))"
+)
+
 
 def handle_model_command(command: str, current_model: str) -> str:
     """Switch or report the current LLM profile."""
@@ -40,22 +52,52 @@ def handle_model_command(command: str, current_model: str) -> str:
     return target
 
 
-def generate_with_model(prompt: str, model_choice: str) -> str:
-    """Generate a response for the prompt using the selected model."""
+def generate_with_model(prompt: str, model_choice: str, system: str | None = None) -> str:
+    """
+    Generate a response for the prompt using the selected model.
+    A system prompt is marked for Anthropic prompt caching, so repeated calls
+    with the same instructions reuse the cached prefix.
+    """
     profile = MODEL_PROFILES.get(model_choice, MODEL_PROFILES[DEFAULT_MODEL])
     backend = profile["backend"]
     model_id = profile["model"]
 
     if backend == "anthropic":
-        client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+        client = get_llm_client(backend, model_id, os.environ.get("ANTHROPIC_API_KEY"))
+        extra = {}
+        if system:
+            extra["system"] = [
+                {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
+            ]
         response = client.messages.create(
             model=model_id,
             max_tokens=1000,
             temperature=0.3,
-            messages=[{"role": "user", "content": prompt}]
+            messages=[{"role": "user", "content": prompt}],
+            **extra,
         )
         return response.content[0].text
     elif backend == "ollama":
+        client = get_llm_client(backend, model_id)
+        result = client.generate({"prompt": prompt, "system": system})
+        if isinstance(result, dict):
+            return result.get("response") or result.get("main_result") or str(result)
+        return str(result)
+    else:
+        raise ValueError(f"Unsupported backend '{backend}' for model '{model_choice}'")
+
+
+@functools.lru_cache(maxsize=8)
+def get_llm_client(backend: str, model_id: str, api_key: str | None = None):
+    """
+    Build the client for a backend/model once and reuse it across REPL turns,
+    keeping its HTTP connections and the Ollama installed-model check warm.
+    """
+    if backend == "anthropic":
+        from anthropic import Anthropic
+
+        return Anthropic(api_key=api_key)
+    if backend == "ollama":
         try:
             from ollama_client import OllamaLLMClient
         except ModuleNotFoundError as exc:
@@ -65,52 +107,46 @@ def generate_with_model(prompt: str, model_choice: str) -> str:
                 "or ensure the module is on PYTHONPATH."
             ) from exc
 
-        client = OllamaLLMClient(model=model_id)
-        result = client.generate({"prompt": prompt})
-        if isinstance(result, dict):
-            return result.get("response") or result.get("main_result") or str(result)
-        return str(result)
-    else:
-        raise ValueError(f"Unsupported backend '{backend}' for model '{model_choice}'")
-
+        return OllamaLLMClient(model=model_id)
+    raise ValueError(f"Unsupported backend '{backend}'")
 
 def infer_focus_from_question(question: str) -> list[str] | None:
     """Infer likely focus paths from the question (simple heuristics)."""
-    tokens = question.replace(",", " ").replace(":", " ").split()
-    focus = set()
-    for tok in tokens:
-        if "/" in tok or tok.endswith((".py", ".md", ".yaml", ".yml", ".json", ".txt")):
-            # take directory or token itself
-            if "/" in tok:
-                path_part = tok.split("/")[0] if tok.startswith("/") else tok.split("/")[0]
-                focus.add(path_part)
-            else:
-                focus.add(tok)
+    focus = {
+        m.group(1) if m.group(1) is not None else m.group(2)
+        for m in _FOCUS_RE.finditer(question)
+    }
     if not focus:
         return ["src", "docs", "config", "tests"]
     return list(focus)
 
-def get_config_dir():
+@functools.lru_cache(maxsize=4)
+def get_config_dir(script_dir: str | None = None):
     """
     Resolve the config directory.
     Tries local ./config first (for development), then installed location.
+    The result is cached per script_dir; call get_config_dir.cache_clear() to re-probe.
     """
     # First try: local config directory relative to this script (for development/editable install)
-    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_dir = script_dir or os.path.dirname(os.path.abspath(__file__))
     config_dir = os.path.join(script_dir, "config")
 
     if os.path.isdir(config_dir):
         return config_dir
 
-    # Second try: installed data files location (for pip install)
-    try:
-        import sys
-        # data_files installs to sys.prefix/ask_chatbot_config
-        installed_config = os.path.join(sys.prefix, 'ask_chatbot_config')
+    # Second try: installed data files location (for pip install). data_files land
+    # under the install scheme's data root: sys.prefix for venv/system installs, the
+    # user base for `pip install --user`. Probe those paths directly; no
+    # pkg_resources/working-set scan is needed to find them.
+    import site
+    import sysconfig
+
+    for data_root in dict.fromkeys([sysconfig.get_path('data'), sys.prefix, site.USER_BASE]):
+        if not data_root:
+            continue
+        installed_config = os.path.join(data_root, 'ask_chatbot_config')
         if os.path.isdir(installed_config):
             return installed_config
-    except Exception:
-        pass
 
     # Final fallback: return the local path even if it doesn't exist
     # (will error later with helpful message)
@@ -130,6 +166,20 @@ def get_model_profile(model_id, profiles_config):
 
     return None
 
+# Identical for every question, so it is sent as the system prompt and marked
+# cacheable; only the question and search results vary between calls.
+SUMMARY_SYSTEM_PROMPT = """You are helping answer a question about a codebase.
+
+Ground rules:
+- If Direct File Snippets exist, answer ONLY from those and cite their paths/line ranges exactly.
+- Otherwise, use RAG Snippets; cite their paths/line ranges exactly.
+- Otherwise, use Search Snippets; cite file paths/lines if present.
+- If nothing usable is available, say so explicitly; do NOT invent details or rely on README.
+
+Always include a short RAG status if present.
+Every claim must include an inline citation of the form path:line-range taken from the provided snippets (e.g., src/agent_engine/runtime/context.py:56-67). If you cannot cite, say so and stop; do not guess or invent line numbers.
+Output 1-2 short paragraphs."""
+
 def summarize_tool_results(user_question, tool_results, model_choice):
     """
     Summarize tool results through the selected LLM backend.
@@ -143,25 +193,13 @@ def summarize_tool_results(user_question, tool_results, model_choice):
         Natural language summary as a string
     """
 
-    prompt = f"""You are helping answer a question about a codebase.
-
-User's question: {user_question}
+    prompt = f"""User's question: {user_question}
 
 Search results (structured):
-{tool_results}
-
-Ground rules:
-- If Direct File Snippets exist, answer ONLY from those and cite their paths/line ranges exactly.
-- Otherwise, use RAG Snippets; cite their paths/line ranges exactly.
-- Otherwise, use Search Snippets; cite file paths/lines if present.
-- If nothing usable is available, say so explicitly; do NOT invent details or rely on README.
-
-Always include a short RAG status if present.
-Every claim must include an inline citation of the form path:line-range taken from the provided snippets (e.g., src/agent_engine/runtime/context.py:56-67). If you cannot cite, say so and stop; do not guess or invent line numbers.
-Output 1-2 short paragraphs."""
+{tool_results}"""
 
     try:
-        return generate_with_model(prompt, model_choice)
+        return generate_with_model(prompt, model_choice, system=SUMMARY_SYSTEM_PROMPT)
     except Exception as e:
         return f"Error summarizing results: {e}\n\nRaw results:\n{tool_results}"
 
@@ -175,6 +213,14 @@ def answer_question(question: str, model_choice: str, focus_areas: list[str] | N
     Returns:
         Natural language answer
     """
+    cache, key = _answer_cache_entry(question, model_choice, focus_areas)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    from tools import search_codebase_tool
+
     print(f"\nSearching codebase...")
 
     # Search the codebase directly
@@ -184,8 +230,31 @@ def answer_question(question: str, model_choice: str, focus_areas: list[str] | N
     print("Analyzing results...")
     answer = summarize_tool_results(question, search_results, model_choice)
 
+    if cache is not None and not answer.startswith("Error summarizing results"):
+        cache.put(key, answer)
     return answer
 
+def _answer_cache_entry(question: str, model_choice: str, focus_areas: list[str] | None):
+    """
+    Return (AnswerCache, key) when ASK_ANSWER_CACHE is set and the workspace is a
+    git checkout, else (None, None). The key covers the question, model profile,
+    focus, config files and the (mtime, size) of every tracked workspace file.
+    """
+    if os.environ.get("ASK_ANSWER_CACHE", "").lower() not in ("1", "true", "yes"):
+        return None, None
+    from answer_cache import AnswerCache, config_fingerprint, workspace_fingerprint
+
+    workspace = workspace_fingerprint(os.getcwd())
+    if workspace is None:
+        return None, None
+    parts = [
+        MODEL_PROFILES.get(model_choice, MODEL_PROFILES[DEFAULT_MODEL]),
+        sorted(focus_areas or []),
+        config_fingerprint(get_config_dir()),
+        workspace,
+    ]
+    return AnswerCache(), AnswerCache.key(question, parts)
+
 def main():
     """
     Main entry point for the 'ask' CLI tool.
@@ -211,6 +280,12 @@ def main():
     )
 
     args = parser.parse_args()
+    # DEBUG records (e.g. RAG and Ollama client internals) are only emitted, and
+    # their %-style arguments only formatted, when ASK_DEBUG is set.
+    logging.basicConfig(
+        level=logging.DEBUG if os.environ.get("ASK_DEBUG") else logging.WARNING,
+        format="%(levelname)s: %(message)s",
+    )
 
     try:
         initial_model = args.model or DEFAULT_MODEL
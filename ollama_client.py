@@ -2,16 +2,75 @@
 
 from __future__ import annotations
 
+import http.client
 import json
 import logging
 import os
-from typing import Any, Callable, Dict, Optional
-from urllib import request as urlrequest
-from urllib.error import URLError
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+from urllib.parse import urlsplit
 
 logger = logging.getLogger(__name__)
 
 
+class KeepAliveSession:
+    """Reuse one persistent HTTP connection per (thread, host) across Ollama requests."""
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self._local = threading.local()
+
+    @contextmanager
+    def post(self, url: str, data: bytes, headers: Dict[str, str]) -> Iterator[http.client.HTTPResponse]:
+        """POST and yield the response; it is drained afterwards so the socket can be reused."""
+        parts = urlsplit(url)
+        key = (parts.scheme or "http", parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        for attempt in range(2):
+            conn = self._connection(key)
+            try:
+                conn.request("POST", path, body=data, headers=headers)
+                resp = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as exc:
+                # The server closed an idle keep-alive socket; retry once on a fresh one.
+                self._drop(key)
+                if attempt:
+                    raise RuntimeError(f"Ollama request failed: {exc}") from exc
+            except (OSError, http.client.HTTPException) as exc:
+                self._drop(key)
+                raise RuntimeError(f"Ollama request failed: {exc}") from exc
+
+        if resp.status >= 400:
+            body = resp.read().decode("utf-8", errors="replace")
+            raise RuntimeError(f"Ollama request failed: HTTP {resp.status} {resp.reason}: {body[:200]}")
+        try:
+            yield resp
+            resp.read()
+        except BaseException:
+            self._drop(key)
+            raise
+
+    def _connection(self, key: Tuple[str, str]) -> http.client.HTTPConnection:
+        conns = self._local.__dict__.setdefault("conns", {})
+        conn = conns.get(key)
+        if conn is None:
+            scheme, netloc = key
+            factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = factory(netloc, timeout=self.timeout)
+            conns[key] = conn
+        return conn
+
+    def _drop(self, key: Tuple[str, str]) -> None:
+        conn = self._local.__dict__.get("conns", {}).pop(key, None)
+        if conn is not None:
+            conn.close()
+
+
 class OllamaLLMClient:
     """Ollama client compatible with Agent Engine's llm_client contract."""
 
@@ -44,19 +103,41 @@ class OllamaLLMClient:
         self.min_llama_size = min_llama_size
         self.max_llama_size = max_llama_size
         self._model_cache: set[str] = set()
-        self.transport = transport or self._urllib_transport
+        self._session = KeepAliveSession(timeout)
+        self.transport = transport or self._http_transport
 
     def generate(self, request: Dict[str, Any] | str) -> Any:
         prompt = request.get("prompt") if isinstance(request, dict) else str(request)
         model_name = self._resolve_model_name(request)
-        payload = {"model": model_name, "prompt": prompt, "stream": False}
+        payload = self._payload(request, model_name, prompt)
         self._ensure_model_available(model_name)
         response = self.transport(self.generate_url, {"Content-Type": "application/json"}, payload)
         return _parse_response(response, content_key="response")
 
     def stream_generate(self, request: Dict[str, Any]):
-        # No streaming in this client; yield single response for compatibility.
-        yield self.generate(request)
+        if self.transport != self._http_transport:
+            # Custom transports return whole responses; yield it as a single chunk.
+            yield self.generate(request)
+            return
+        prompt = request.get("prompt") if isinstance(request, dict) else str(request)
+        model_name = self._resolve_model_name(request)
+        payload = self._payload(request, model_name, prompt)
+        self._ensure_model_available(model_name)
+        data = json.dumps(payload).encode("utf-8")
+        with self._session.post(self.generate_url, data, {"Content-Type": "application/json"}) as resp:
+            for chunk in _iter_stream(resp):
+                text = chunk.get("response")
+                if text:
+                    yield text
+
+    def _payload(self, request: Dict[str, Any] | str, model_name: str, prompt: Any) -> Dict[str, Any]:
+        # Ollama's non-streaming path can be pathologically slow for some models,
+        # so always stream and let the transport accumulate the chunks.
+        payload = {"model": model_name, "prompt": prompt, "stream": True}
+        if isinstance(request, dict) and request.get("system"):
+            # Sent separately so the model's prompt template keeps it as a stable prefix.
+            payload["system"] = request["system"]
+        return payload
 
     def _resolve_model_name(self, request: Dict[str, Any] | str) -> str:
         requested_model = self.model
@@ -128,15 +209,13 @@ class OllamaLLMClient:
         except Exception as exc:
             logger.warning("Failed to pull Ollama model %s: %s", model, exc)
 
-    def _urllib_transport(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Any:
+    def _http_transport(self, url: str, headers: Dict[str, str], payload: Dict[str, Any]) -> Any:
         data = json.dumps(payload).encode("utf-8")
-        req = urlrequest.Request(url, data=data, headers=headers, method="POST")
-        try:
-            with urlrequest.urlopen(req, timeout=self.timeout) as resp:
-                body = resp.read().decode("utf-8")
-                return json.loads(body) if body else {}
-        except URLError as exc:
-            raise RuntimeError(f"Ollama request failed: {exc}") from exc
+        with self._session.post(url, data, headers) as resp:
+            if payload.get("stream"):
+                return _accumulate_stream(resp)
+            body = resp.read()
+            return json.loads(body) if body else {}
 
 
 def _get_system_memory_gb() -> int:
@@ -160,13 +239,46 @@ def _get_system_memory_gb() -> int:
     return 0
 
 
+def _iter_stream(lines: Iterable[Any]) -> Iterator[Dict[str, Any]]:
+    """Decode newline-delimited JSON chunks from a streaming Ollama response.
+
+    Ollama reports a failure partway through a stream as an {"error": ...} chunk; that
+    raises instead of ending the answer early.
+    """
+    for raw in lines:
+        raw = raw.strip()
+        if raw:
+            chunk = json.loads(raw)
+            if isinstance(chunk, dict) and chunk.get("error"):
+                raise RuntimeError(f"Ollama request failed: {chunk['error']}")
+            yield chunk
+
+
+def _accumulate_stream(lines: Iterable[Any]) -> Dict[str, Any]:
+    """Join streamed chunks into the same dict shape as a non-streaming response."""
+    parts = []
+    final: Dict[str, Any] = {}
+    for chunk in _iter_stream(lines):
+        parts.append(chunk.get("response", ""))
+        final = chunk
+    result = dict(final)
+    result["response"] = "".join(parts)
+    return result
+
+
 def _parse_response(response: Any, content_key: str) -> Any:
     if hasattr(response, "json"):
         try:
             data = response.json()
         except Exception:
             text = getattr(response, "text", None)
-            data = json.loads(text) if text else {}
+            if not text:
+                data = {}
+            else:
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    data = _accumulate_stream(text.splitlines())
     else:
         data = response
 
@@ -2,18 +2,51 @@
 
 from __future__ import annotations
 
+import hashlib
+import io
 import json
 import logging
+import multiprocessing
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass
+from itertools import islice, repeat
 from math import sqrt
-from typing import Any, Dict, Iterable, List, Optional, Sequence
-from urllib import request as urlrequest
-from urllib.error import URLError
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+from ollama_client import KeepAliveSession
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional speedup; stdlib json is the fallback
+    orjson = None
+
+try:
+    import hnswlib  # type: ignore
+except ImportError:  # optional; retrieval falls back to a brute-force scan
+    hnswlib = None
 
 logger = logging.getLogger(__name__)
 
 
+def _json_dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # ---------- Embeddings ----------
 
 
@@ -25,6 +58,7 @@ class OllamaEmbeddingProvider:
         model: str = "nomic-embed-text",
         base_url: str | None = None,
         timeout: int | None = None,
+        concurrency: int | None = None,
     ) -> None:
         self.model = model
         host = os.environ.get("OLLAMA_HOST") or "http://127.0.0.1:11434"
@@ -37,26 +71,42 @@ class OllamaEmbeddingProvider:
             except Exception:
                 timeout = timeout
         self.timeout = timeout or 60
+        env_concurrency = os.environ.get("OLLAMA_EMBED_CONCURRENCY")
+        if env_concurrency:
+            try:
+                concurrency = int(env_concurrency)
+            except Exception:
+                concurrency = concurrency
+        self.concurrency = max(1, concurrency or 4)
+        # Each worker thread keeps its own keep-alive connection to Ollama, so the
+        # workers are created once and reused by every embed() call.
+        self._session = KeepAliveSession(self.timeout)
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
 
     def embed(self, texts: Sequence[str]) -> List[List[float]]:
-        vectors: List[List[float]] = []
-        for text in texts:
-            payload = json.dumps({"model": self.model, "prompt": text}).encode("utf-8")
-            req = urlrequest.Request(
-                self.base_url,
-                data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST",
-            )
-            try:
-                with urlrequest.urlopen(req, timeout=self.timeout) as resp:
-                    data = json.loads(resp.read().decode("utf-8")) if resp else {}
-            except URLError as exc:
-                raise RuntimeError(f"Ollama embedding request failed: {exc}") from exc
-            vec = _parse_embedding_response(data)
-            if vec is not None:
-                vectors.append(vec)
-        return vectors
+        texts = list(texts)
+        if len(texts) <= 1 or self.concurrency == 1:
+            results = [self._embed_one(text) for text in texts]
+        else:
+            # Requests are independent; keep several in flight so the server
+            # (see OLLAMA_NUM_PARALLEL) can batch them instead of paying one RTT each.
+            results = list(self._executor().map(self._embed_one, texts))
+        return [vec for vec in results if vec is not None]
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.concurrency, thread_name_prefix="ollama-embed"
+                )
+            return self._pool
+
+    def _embed_one(self, text: str) -> Optional[List[float]]:
+        payload = _json_dumps({"model": self.model, "prompt": text})
+        with self._session.post(self.base_url, payload, {"Content-Type": "application/json"}) as resp:
+            body = resp.read()
+        return _parse_embedding_response(_json_loads(body) if body else {})
 
 
 def _parse_embedding_response(data: Any) -> Optional[List[float]]:
@@ -89,45 +139,325 @@ class Chunk:
     path: str
     start_line: int
     end_line: int
-    text: str
-    embedding: List[float]
+    # Only populated while embedding and for retrieved results; never persisted.
+    text: str = ""
+    # Dequantization factor for this chunk's int8 row in the vectors sidecar.
+    scale: float = 0.0
+    # mtime of the source file when the chunk was built (drives incremental rebuilds).
+    modified_time: float = 0.0
+    # blake2b of the source file's bytes; unchanged content keeps its embeddings.
+    content_hash: str = ""
     score: float = 0.0
 
 
+@dataclass
+class ChunkTable:
+    """Column-wise index metadata, one entry per row of the vector matrix.
+
+    Ranking scans only the matrix and ``scales``; ``row(i)`` builds a Chunk on demand
+    for the few rows that are actually returned.
+    """
+
+    ids: List[str]
+    paths: List[str]
+    start_lines: np.ndarray
+    end_lines: np.ndarray
+    scales: np.ndarray
+    modified_times: np.ndarray
+    content_hashes: List[str]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records: Sequence[Dict[str, Any]]) -> "ChunkTable":
+        return cls(
+            ids=[r["id"] for r in records],
+            paths=[r["path"] for r in records],
+            start_lines=np.fromiter((r["start_line"] for r in records), np.int32, len(records)),
+            end_lines=np.fromiter((r["end_line"] for r in records), np.int32, len(records)),
+            scales=np.fromiter((r.get("scale", 0.0) for r in records), np.float32, len(records)),
+            modified_times=np.fromiter((r.get("modified_time", 0.0) for r in records), np.float64, len(records)),
+            content_hashes=[r.get("content_hash", "") for r in records],
+        )
+
+    @classmethod
+    def from_chunks(cls, chunks: Sequence[Chunk]) -> "ChunkTable":
+        return cls(
+            ids=[c.id for c in chunks],
+            paths=[c.path for c in chunks],
+            start_lines=np.fromiter((c.start_line for c in chunks), np.int32, len(chunks)),
+            end_lines=np.fromiter((c.end_line for c in chunks), np.int32, len(chunks)),
+            scales=np.fromiter((c.scale for c in chunks), np.float32, len(chunks)),
+            modified_times=np.fromiter((c.modified_time for c in chunks), np.float64, len(chunks)),
+            content_hashes=[c.content_hash for c in chunks],
+        )
+
+    def row(self, i: int) -> Chunk:
+        return Chunk(
+            id=self.ids[i],
+            path=self.paths[i],
+            start_line=int(self.start_lines[i]),
+            end_line=int(self.end_lines[i]),
+            scale=float(self.scales[i]),
+            modified_time=float(self.modified_times[i]),
+            content_hash=self.content_hashes[i],
+        )
+
+
+def quantize_rows(vectors: Sequence[Sequence[float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric max-abs int8 quantization of L2-normalized rows -> (int8 matrix, scales)."""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.size == 0:
+        return np.zeros((0, 0), dtype=np.int8), np.zeros(0, dtype=np.float32)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+    max_abs = np.abs(matrix).max(axis=1)
+    safe = np.where(max_abs == 0, 1.0, max_abs)
+    quantized = np.round(matrix / safe[:, None] * 127).astype(np.int8)
+    return quantized, (max_abs / 127).astype(np.float32)
+
+
+# Below this many rows a brute-force scan beats building and querying an HNSW graph.
+ANN_MIN_ROWS = 2000
+# HNSW query beam width; raised to top_k when more results are requested.
+ANN_EF_SEARCH = 64
+
+
 class SimpleVectorStore:
-    """JSON-backed vector store at .agent_engine/rag_index.json."""
+    """Vector store at .agent_engine/rag_index.json (metadata) + rag_index.npy (int8 vectors).
+
+    With ``hnswlib`` installed, indexes of at least ANN_MIN_ROWS rows also get an HNSW
+    graph in rag_index.hnsw for approximate nearest-neighbour search.
+    """
 
     def __init__(self, path: str) -> None:
         self.path = path
+        self.vectors_path = os.path.splitext(path)[0] + ".npy"
+        self.ann_path = os.path.splitext(path)[0] + ".hnsw"
+        # int8 (N, D) matrix (memory-mapped), row-aligned with the loaded ChunkTable.
+        self.matrix: Optional[np.ndarray] = None
+        self._ann: Optional[Any] = None
+        self._ann_key: Optional[Tuple[int, int]] = None
+        # Last table/matrix returned by load(), keyed by both files' (mtime_ns, size).
+        self._loaded: Optional[Tuple[Tuple[int, int, int, int], ChunkTable, np.ndarray]] = None
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
 
-    def load(self) -> List[Chunk]:
-        if not os.path.exists(self.path):
-            return []
-        with open(self.path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        return [Chunk(**item) for item in data]
-
-    def save(self, chunks: Iterable[Chunk]) -> None:
+    def load(self) -> ChunkTable:
+        """Load the index, reusing the previous parse while neither file has changed."""
+        self.matrix = None
+        key = self._files_key()
+        if key is None:
+            # Indexes from before the sidecar format are rebuilt on demand.
+            return ChunkTable.from_records([])
+        if self._loaded is not None and self._loaded[0] == key:
+            _, table, self.matrix = self._loaded
+            return table
+        with open(self.path, "rb") as f:
+            data = _json_loads(f.read())
+        matrix = np.load(self.vectors_path, mmap_mode="r")
+        if matrix.ndim != 2 or matrix.shape[0] != len(data):
+            logger.warning("RAG index %s does not match its vectors; rebuilding.", self.path)
+            return ChunkTable.from_records([])
+        # Older indexes may still carry chunk text; from_records never reads it.
+        table = ChunkTable.from_records(data)
+        self.matrix = matrix
+        self._loaded = (key, table, matrix)
+        return table
+
+    def _files_key(self) -> Optional[Tuple[int, int, int, int]]:
+        try:
+            meta_st, vec_st = os.stat(self.path), os.stat(self.vectors_path)
+        except OSError:
+            return None
+        return (meta_st.st_mtime_ns, meta_st.st_size, vec_st.st_mtime_ns, vec_st.st_size)
+
+    def save(self, chunks: Iterable[Chunk], matrix: np.ndarray) -> None:
+        chunks = list(chunks)
         serializable = [
             {
                 "id": c.id,
                 "path": c.path,
                 "start_line": c.start_line,
                 "end_line": c.end_line,
-                "text": c.text,
-                "embedding": c.embedding,
+                "scale": c.scale,
+                "modified_time": c.modified_time,
+                "content_hash": c.content_hash,
                 "score": c.score,
             }
             for c in chunks
         ]
-        with open(self.path, "w", encoding="utf-8") as f:
-            json.dump(serializable, f, ensure_ascii=False, indent=2)
+        # Each file is written aside and swapped in whole, so neither is ever half-written.
+        # The two swaps are separate, though: a reader landing between them can pair new
+        # vectors with old metadata. load() rebuilds when the row counts disagree; a pair
+        # with equal counts goes unnoticed until the next save.
+        tmp_vectors = self.vectors_path + ".tmp"
+        with open(tmp_vectors, "wb") as fh:
+            np.save(fh, np.ascontiguousarray(matrix, dtype=np.int8))
+        tmp_meta = self.path + ".tmp"
+        with open(tmp_meta, "wb") as f:
+            f.write(_json_dumps(serializable))
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_meta, self.path)
+        self.matrix = np.asarray(matrix, dtype=np.int8)
+        key = self._files_key()
+        # The next load() returns what was just written instead of parsing it back.
+        self._loaded = (key, ChunkTable.from_chunks(chunks), self.matrix) if key else None
+        self._save_ann(self.matrix)
+
+    def ann(self) -> Optional[Any]:
+        """Return the HNSW index matching the loaded matrix, or None to scan brute-force."""
+        if hnswlib is None or self.matrix is None or self.matrix.shape[0] < ANN_MIN_ROWS:
+            return None
+        try:
+            st = os.stat(self.ann_path)
+        except OSError:
+            return None
+        key = (st.st_mtime_ns, st.st_size)
+        if key != self._ann_key:
+            index = hnswlib.Index(space="cosine", dim=self.matrix.shape[1])
+            try:
+                index.load_index(self.ann_path, max_elements=self.matrix.shape[0])
+            except RuntimeError as exc:
+                logger.warning("Ignoring unreadable ANN index %s: %s", self.ann_path, exc)
+                return None
+            self._ann, self._ann_key = index, key
+        if self._ann.get_current_count() != self.matrix.shape[0]:
+            return None
+        return self._ann
+
+    def _save_ann(self, matrix: np.ndarray) -> None:
+        if hnswlib is None or matrix.shape[0] < ANN_MIN_ROWS:
+            # Never leave a graph behind that describes an older, larger index.
+            if os.path.exists(self.ann_path):
+                os.remove(self.ann_path)
+            return
+        # Cosine space ignores row magnitude, so the int8 rows need no dequantizing.
+        index = hnswlib.Index(space="cosine", dim=matrix.shape[1])
+        index.init_index(max_elements=matrix.shape[0], ef_construction=200, M=16)
+        index.add_items(matrix.astype(np.float32), np.arange(matrix.shape[0]))
+        tmp_ann = self.ann_path + ".tmp"
+        index.save_index(tmp_ann)
+        os.replace(tmp_ann, self.ann_path)
+
+
+def _normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form of a query, used for cache keys.
+
+    Trailing sentence punctuation is dropped too, so "What is X?" and "what is x" share
+    an entry; anything that can be part of an identifier (__init__, .env, --verbose) is kept.
+    """
+    return " ".join(query.lower().split()).rstrip("?!.,;: ")
+
+
+class QueryVectorCache:
+    """Query embeddings saved as one .npy file per query, so repeated questions skip Ollama.
+
+    Unlike Retriever's in-memory caches this survives across runs of the CLI. Entries
+    are keyed on the embedding model as well as the query, and the least recently used
+    files are removed once there are more than max_entries.
+    """
+
+    def __init__(self, directory: str, model: str, max_entries: int = 256) -> None:
+        self.directory = directory
+        self.model = model
+        self.max_entries = max_entries
+
+    def _path(self, query: str) -> str:
+        key = hashlib.blake2b(
+            f"{self.model}\0{_normalize_query(query)}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+        return os.path.join(self.directory, key + ".npy")
+
+    def get(self, query: str) -> Optional[np.ndarray]:
+        path = self._path(query)
+        try:
+            vec = np.load(path)
+            os.utime(path)  # mark as recently used
+        except (OSError, ValueError):
+            return None
+        return vec if vec.ndim == 1 else None
+
+    def put(self, query: str, vec: Union[Sequence[float], np.ndarray]) -> None:
+        path = self._path(query)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp, "wb") as fh:
+                np.save(fh, np.asarray(vec, dtype=np.float32))
+            os.replace(tmp, path)
+            self._evict()
+        except OSError as exc:
+            logger.warning("Could not write query vector cache %s: %s", path, exc)
+
+    def _evict(self) -> None:
+        with os.scandir(self.directory) as it:
+            entries = [e for e in it if e.name.endswith(".npy")]
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime_ns)
+        for entry in entries[: len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
 
 
 # ---------- Retriever ----------
 
 
+# Directories never descended into when indexing (.agent_engine holds the index itself).
+_SKIP_DIRS = frozenset({
+    ".git", "venv", ".venv", "__pycache__", "node_modules", ".agent_engine",
+    # Tool caches full of generated .json/.txt that would otherwise be embedded.
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox",
+})
+# Below this many files, process start-up costs more than chunking serially.
+PARALLEL_CHUNK_MIN_FILES = 256
+# Start method for chunking workers: forkserver where available, else spawn (Windows).
+_POOL_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+# Chunks handed to the embedder per batch, and batches the chunker may run ahead by.
+EMBED_BATCH_SIZE = 100
+EMBED_QUEUE_DEPTH = 4
+# Distinct query strings whose results a Retriever remembers verbatim.
+QUERY_CACHE_SIZE = 128
+# Query embeddings kept on disk under .agent_engine/query_vectors (ASK_QUERY_VECTOR_CACHE).
+QUERY_VECTOR_CACHE_SIZE = 256
+# Seconds between checks of the workspace for files changed since the index was written.
+INDEX_CHECK_INTERVAL = 30.0
+# Largest float32 copy of the index a Retriever keeps for brute-force scoring (~80k x 768).
+DENSE_MATRIX_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _chunk_file(rel: str, path: str, chunk_lines: int) -> List[Chunk]:
+    """Split one file into line-window chunks with empty embeddings (runs in worker processes)."""
+    with open(path, "rb") as f:
+        modified_time = os.fstat(f.fileno()).st_mtime
+        raw = f.read()
+    content_hash = hashlib.blake2b(raw, digest_size=16).hexdigest()
+    # StringIO(newline=None) splits exactly like text-mode readlines().
+    lines = io.StringIO(raw.decode("utf-8", errors="ignore"), newline=None).readlines()
+    chunks: List[Chunk] = []
+    for i in range(0, len(lines), chunk_lines):
+        text = "".join(lines[i : i + chunk_lines])
+        if not text.strip():
+            continue
+        end = min(i + chunk_lines, len(lines))
+        chunks.append(
+            Chunk(
+                id=f"{rel}:{i+1}-{end}",
+                path=rel,
+                start_line=i + 1,
+                end_line=end,
+                text=text,
+                modified_time=modified_time,
+                content_hash=content_hash,
+            )
+        )
+    return chunks
+
+
 class Retriever:
     def __init__(
         self,
@@ -141,59 +471,376 @@ class Retriever:
         self.embedder = embedder
         self.store = store
         self.include_ext = include_ext or [".py", ".md", ".txt", ".json", ".yaml", ".yml"]
+        self._ext_tuple = tuple(self.include_ext)
         self.chunk_lines = chunk_lines
+        # Proximity cache: near-duplicate queries (cosine >= tau) reuse earlier results.
+        self.proximity_tau = _env_float("ASK_PROXIMITY_TAU", 0.95)
+        cap = max(0, int(_env_float("ASK_PROXIMITY_CAP", 64)))
+        self._cache: Deque[Tuple[np.ndarray, int, List[Chunk]]] = deque(maxlen=cap)
+        # Exact cache keyed by the normalized query text; a hit skips the embedding call.
+        self._query_cache: "OrderedDict[bytes, Tuple[int, List[Chunk]]]" = OrderedDict()
+        # Table the caches were filled against; a different one (index rebuilt) resets them.
+        self._cached_table: Optional[ChunkTable] = None
+        self._dense: Optional[np.ndarray] = None
+        self._next_index_check = 0.0
+        vector_cap = max(0, int(_env_float("ASK_QUERY_VECTOR_CACHE", QUERY_VECTOR_CACHE_SIZE)))
+        self._vector_cache = (
+            QueryVectorCache(
+                os.path.join(os.path.dirname(store.path), "query_vectors"),
+                getattr(embedder, "model", type(embedder).__name__),
+                vector_cap,
+            )
+            if vector_cap
+            else None
+        )
 
     def build_index(self) -> List[Chunk]:
-        chunks: List[Chunk] = []
-        for root, _, files in os.walk(self.workspace_root):
-            if ".git" in root or "venv" in root or "__pycache__" in root:
-                continue
+        chunks, matrix = self._chunk_and_embed(*self._collect_files())
+        self.store.save(chunks, matrix)
+        self._clear_caches()
+        return chunks
+
+    def build_index_incremental(self) -> List[Chunk]:
+        """Re-embed only files whose content changed since the stored index was written.
+
+        An unchanged mtime skips a file outright; otherwise the file is re-read and its
+        content hash decides whether the stored embeddings are still valid.
+        """
+        existing = self.store.load()
+        if not existing:
+            return self.build_index()
+        old_matrix = self.store.matrix
+
+        # Bucket stored rows by path once: O(files + chunks) instead of a scan per file.
+        rows_by_path: Dict[str, List[int]] = {}
+        indexed_mtimes: Dict[str, float] = {}
+        indexed_hashes: Dict[str, str] = {}
+        for row, (path, modified_time, content_hash) in enumerate(
+            zip(existing.paths, existing.modified_times.tolist(), existing.content_hashes)
+        ):
+            rows_by_path.setdefault(path, []).append(row)
+            indexed_mtimes[path] = max(indexed_mtimes.get(path, 0.0), modified_time)
+            indexed_hashes[path] = content_hash
+
+        kept_rows: List[int] = []
+        stale_rels, stale_paths = [], []
+        for rel, path in zip(*self._collect_files()):
+            try:
+                modified_time = os.stat(path).st_mtime
+            except FileNotFoundError:
+                continue  # deleted since the walk; its rows are dropped like any removed file
+            rows = rows_by_path.get(rel)
+            if rows and modified_time <= indexed_mtimes[rel]:
+                kept_rows.extend(rows)
+            else:
+                stale_rels.append(rel)
+                stale_paths.append(path)
+
+        # Touched but byte-identical files (formatter, checkout, touch) keep their rows.
+        touched: Dict[str, float] = {}
+
+        def unchanged(chunk: Chunk) -> bool:
+            if chunk.path in rows_by_path and chunk.content_hash and chunk.content_hash == indexed_hashes[chunk.path]:
+                touched[chunk.path] = chunk.modified_time
+                return True
+            return False
+
+        fresh, fresh_matrix = self._chunk_and_embed(stale_rels, stale_paths, skip=unchanged)
+        for path in touched:
+            kept_rows.extend(rows_by_path[path])
+        kept = [existing.row(row) for row in kept_rows]
+        for chunk in kept:
+            if chunk.path in touched:
+                chunk.modified_time = touched[chunk.path]
+        chunks = kept + fresh
+        kept_matrix = np.asarray(old_matrix[kept_rows], dtype=np.int8)
+        if not fresh:
+            matrix = kept_matrix
+        elif not kept_rows:
+            matrix = fresh_matrix
+        else:
+            matrix = np.concatenate([kept_matrix, fresh_matrix])
+        self.store.save(chunks, matrix)
+        self._clear_caches()
+        return chunks
+
+    def _collect_files(self) -> Tuple[List[str], List[str]]:
+        rels, paths = [], []
+        for root, dirs, files in os.walk(self.workspace_root):
+            dirs[:] = [d for d in dirs if d not in _SKIP_DIRS]
             for fname in files:
-                if not any(fname.endswith(ext) for ext in self.include_ext):
+                if not fname.endswith(self._ext_tuple):
                     continue
                 path = os.path.join(root, fname)
-                rel = os.path.relpath(path, self.workspace_root)
-                with open(path, "r", encoding="utf-8", errors="ignore") as f:
-                    lines = f.readlines()
-                for i in range(0, len(lines), self.chunk_lines):
-                    chunk_lines = lines[i : i + self.chunk_lines]
-                    text = "".join(chunk_lines)
-                    if not text.strip():
-                        continue
-                    chunks.append(
-                        Chunk(
-                            id=f"{rel}:{i+1}-{min(i+self.chunk_lines,len(lines))}",
-                            path=rel,
-                            start_line=i + 1,
-                            end_line=min(i + self.chunk_lines, len(lines)),
-                            text=text,
-                            embedding=[],
-                        )
-                    )
-
-        embeddings = self.embedder.embed([c.text for c in chunks])
-        for chunk, vec in zip(chunks, embeddings):
-            chunk.embedding = vec
-
-        self.store.save(chunks)
-        return chunks
+                rels.append(os.path.relpath(path, self.workspace_root))
+                paths.append(path)
+        return rels, paths
+
+    def _iter_file_chunks(self, rels: List[str], paths: List[str]) -> Iterator[List[Chunk]]:
+        """Yield each file's chunks in order, fanning out to worker processes for large trees.
+
+        Only a pool that fails to start or dies falls back to serial chunking; an error
+        raised by _chunk_file itself (say, an unreadable file) propagates as it would serially.
+        """
+        done = 0
+        if len(paths) >= PARALLEL_CHUNK_MIN_FILES:
+            try:
+                # Never fork: this runs on the chunker thread while the embedding consumer,
+                # the executor's own threads and search_codebase_tool's pool are alive, and
+                # a forked child can inherit a lock one of them held.
+                pool = ProcessPoolExecutor(mp_context=_POOL_CONTEXT)
+                results = pool.map(_chunk_file, rels, paths, repeat(self.chunk_lines), chunksize=16)
+            except (OSError, BrokenProcessPool) as exc:
+                logger.warning("Parallel chunking unavailable (%s); chunking serially.", exc)
+            else:
+                with pool:
+                    try:
+                        for file_chunks in results:
+                            done += 1
+                            yield file_chunks
+                        return
+                    except BrokenProcessPool as exc:
+                        logger.warning("Chunking worker pool died (%s); chunking serially.", exc)
+        # Resume after whatever the pool already delivered so no file is chunked twice.
+        for rel, path in zip(rels[done:], paths[done:]):
+            yield _chunk_file(rel, path, self.chunk_lines)
+
+    def _chunk_and_embed(
+        self,
+        rels: List[str],
+        paths: List[str],
+        skip: Optional[Callable[[Chunk], bool]] = None,
+    ) -> Tuple[List[Chunk], np.ndarray]:
+        """Chunk files on a producer thread while the caller's thread embeds finished batches.
+
+        Chunking is CPU-bound and embedding waits on Ollama, so overlapping them makes a
+        build take roughly max(chunk, embed) time instead of their sum. The queue is bounded
+        so a fast producer cannot buffer the whole workspace ahead of the embedder.
+        """
+        batches: "queue.Queue[Optional[List[Chunk]]]" = queue.Queue(maxsize=EMBED_QUEUE_DEPTH)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def put(item: Optional[List[Chunk]]) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
-    def _maybe_load_index(self) -> List[Chunk]:
-        chunks = self.store.load()
-        if not chunks:
-            chunks = self.build_index()
-        return chunks
+        def produce() -> None:
+            pending: List[Chunk] = []
+            try:
+                for file_chunks in self._iter_file_chunks(rels, paths):
+                    if skip is not None:
+                        file_chunks = [c for c in file_chunks if not skip(c)]
+                    pending.extend(file_chunks)
+                    while len(pending) >= EMBED_BATCH_SIZE:
+                        if not put(pending[:EMBED_BATCH_SIZE]):
+                            return
+                        pending = pending[EMBED_BATCH_SIZE:]
+                if pending:
+                    put(pending)
+            except BaseException as exc:
+                errors.append(exc)
+            finally:
+                put(None)
+
+        producer = threading.Thread(target=produce, name="rag-chunker", daemon=True)
+        producer.start()
+        chunks: List[Chunk] = []
+        matrices: List[np.ndarray] = []
+        try:
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    break
+                batch, matrix = self._embed_chunks(batch)
+                chunks.extend(batch)
+                if len(batch):
+                    matrices.append(matrix)
+        finally:
+            stop.set()
+            producer.join()
+        if errors:
+            raise errors[0]
+        if not matrices:
+            return chunks, quantize_rows([])[0]
+        return chunks, np.concatenate(matrices)
+
+    def _embed_chunks(self, chunks: List[Chunk]) -> Tuple[List[Chunk], np.ndarray]:
+        embeddings = self.embedder.embed([c.text for c in chunks]) if chunks else []
+        chunks = chunks[: len(embeddings)]
+        matrix, scales = quantize_rows(embeddings)
+        for chunk, scale in zip(chunks, scales):
+            chunk.scale = float(scale)
+            chunk.text = ""
+        return chunks, matrix
+
+    def _clear_caches(self) -> None:
+        self._cache.clear()
+        self._query_cache.clear()
+        self._dense = None
+
+    def _dense_matrix(self, matrix: np.ndarray, table: ChunkTable) -> Optional[np.ndarray]:
+        """Dequantized float32 copy of the index (row * scale), kept while the table is current.
+
+        int8 @ float32 upcasts the whole matrix on every query anyway; keeping the result
+        turns each brute-force scan into a single float32 GEMV. Indexes whose copy would
+        exceed DENSE_MATRIX_MAX_BYTES keep converting per query instead.
+        """
+        if self._dense is None:
+            if matrix.size * 4 > DENSE_MATRIX_MAX_BYTES:
+                return None
+            dense = np.asarray(matrix, dtype=np.float32, order="C")
+            dense *= table.scales[:, None]
+            self._dense = dense
+        return self._dense
+
+    def _maybe_load_index(self) -> ChunkTable:
+        table = self.store.load()
+        if not table:
+            self.build_index()
+            return self.store.load()
+        now = time.monotonic()
+        if now >= self._next_index_check:
+            self._next_index_check = now + INDEX_CHECK_INTERVAL
+            if self._index_is_stale(table):
+                self.build_index_incremental()
+                table = self.store.load()
+        return table
+
+    def _index_is_stale(self, table: ChunkTable) -> bool:
+        """Whether an indexed file is gone or any source file is newer than the index.
+
+        New and edited files get a fresh mtime, so comparing against the index file's own
+        mtime catches both; build_index_incremental then re-embeds only what changed.
+        """
+        try:
+            index_mtime = os.stat(self.store.path).st_mtime
+        except OSError:
+            return True
+        rels, paths = self._collect_files()
+        if not set(table.paths) <= set(rels):
+            return True
+        for path in paths:
+            try:
+                if os.stat(path).st_mtime > index_mtime:
+                    return True
+            except FileNotFoundError:
+                return True
+        return False
 
     def retrieve(self, query: str, top_k: int = 6) -> List[Chunk]:
-        chunks = self._maybe_load_index()
+        table = self._maybe_load_index()
+        if table is not self._cached_table:
+            self._clear_caches()
+            self._cached_table = table
+        if not table:
+            return []
+        text_key = hashlib.blake2b(_normalize_query(query).encode("utf-8"), digest_size=16).digest()
+        hit = self._query_cache.get(text_key)
+        if hit is not None and hit[0] >= top_k:
+            self._query_cache.move_to_end(text_key)
+            return hit[1][:top_k]
+        ranked = self._rank(table, query, top_k)
+        if ranked and QUERY_CACHE_SIZE:
+            self._query_cache[text_key] = (top_k, ranked)
+            self._query_cache.move_to_end(text_key)
+            if len(self._query_cache) > QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+        return ranked
+
+    def _embed_query(self, query: str) -> Optional[np.ndarray]:
+        cached = self._vector_cache.get(query) if self._vector_cache else None
+        if cached is not None:
+            return cached.astype(np.float32, copy=False)
         query_vecs = self.embedder.embed([query])
         if not query_vecs:
+            return None
+        qv = np.asarray(query_vecs[0], dtype=np.float32)
+        if self._vector_cache:
+            self._vector_cache.put(query, qv)
+        return qv
+
+    def _rank(self, table: ChunkTable, query: str, top_k: int) -> List[Chunk]:
+        qv = self._embed_query(query)
+        if qv is None:
+            return []
+        matrix = self.store.matrix
+        if matrix is None or len(qv) != matrix.shape[1]:
+            logger.warning("Query embedding does not match the RAG index; skipping retrieval.")
             return []
-        qv = query_vecs[0]
-        for chunk in chunks:
-            chunk.score = cosine_similarity(qv, chunk.embedding)
-        ranked = sorted(chunks, key=lambda c: c.score, reverse=True)
-        return ranked[:top_k]
+
+        q = qv / (np.linalg.norm(qv) + 1e-12)
+        cached = self._lookup_cache(q, top_k)
+        if cached is not None:
+            return cached
+        k = min(top_k, len(table))
+        if k <= 0:
+            return []
+        ann = self.store.ann()
+        if ann is not None:
+            ann.set_ef(max(ANN_EF_SEARCH, k))
+            labels, _ = ann.knn_query(q, k=k)
+            top = labels[0].astype(np.intp)
+            # Score the candidates exactly so results match the brute-force scale.
+            top_scores = (matrix[top] @ q) * table.scales[top]
+        else:
+            dense = self._dense_matrix(matrix, table)
+            if dense is not None:
+                scores = dense @ q
+            else:
+                # Rows were quantized from unit vectors, so row * scale ~= normalized embedding.
+                scores = (matrix @ q) * table.scales
+            # O(N) selection of the k best, then sort only those k (no full O(N log N) sort,
+            # and no negated copy of the N-length score vector).
+            top = np.argpartition(scores, len(scores) - k)[-k:]
+            top_scores = scores[top]
+        order = np.argsort(top_scores)[::-1]
+        ranked = []
+        for i, score in zip(top[order].tolist(), top_scores[order].tolist()):
+            chunk = table.row(i)
+            chunk.score = score
+            chunk.text = self._materialize(chunk)
+            ranked.append(chunk)
+        if self._cache.maxlen:
+            self._cache.append((q, top_k, ranked))
+        return ranked
+
+    def _materialize(self, chunk: Chunk) -> str:
+        """Re-read a chunk's lines from disk; the index stores only its line range."""
+        path = os.path.join(self.workspace_root, chunk.path)
+        try:
+            # Same decoding and newline handling as _chunk_file, so line numbers agree.
+            with open(path, "r", encoding="utf-8", errors="ignore", newline=None) as f:
+                return "".join(islice(f, chunk.start_line - 1, chunk.end_line))
+        except OSError as exc:
+            logger.warning("Could not read %s for RAG snippet: %s", chunk.path, exc)
+            return ""
+
+    def _lookup_cache(self, q: np.ndarray, top_k: int) -> Optional[List[Chunk]]:
+        if not self._cache:
+            return None
+        sims = np.stack([key for key, _, _ in self._cache]) @ q
+        best = int(np.argmax(sims))
+        key, cached_k, result = self._cache[best]
+        if sims[best] >= self.proximity_tau and cached_k >= top_k:
+            return result[:top_k]
+        return None
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning("Ignoring invalid %s=%r", name, value)
+        return default
 
 
 def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
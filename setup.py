@@ -1,33 +1,46 @@
 from setuptools import setup
 import os
+import sys
 
 # Get the directory where setup.py is located
 here = os.path.abspath(os.path.dirname(__file__))
 
+
+def config_files(*names):
+    return [os.path.join(here, 'config', *name.split('/')) for name in names]
+
+
 setup(
     name="ask-chatbot",
     version="0.1.0",
     description="A CLI tool to ask questions about codebases using AI agents",
     author="Help Chatbot",
-    py_modules=['main', 'tools', 'ollama_client', 'rag'],
+    py_modules=['main', 'tools', 'ollama_client', 'rag', 'config_loader', 'answer_cache'],
     data_files=[
-        ('ask_chatbot_config', [
-            os.path.join(here, 'config', 'agents.yaml'),
-            os.path.join(here, 'config', 'workflow.yaml'),
-            os.path.join(here, 'config', 'tools.yaml'),
-            os.path.join(here, 'config', 'cli_profiles.yaml'),
-            os.path.join(here, 'config', 'memory.yaml'),
-            os.path.join(here, 'config', 'provider_credentials.yaml'),
-        ]),
-        ('ask_chatbot_config/schemas', [
-            os.path.join(here, 'config', 'schemas', 'workflow_schemas.yaml'),
-        ]),
+        ('ask_chatbot_config', config_files(
+            'agents.yaml',
+            'workflow.yaml',
+            'tools.yaml',
+            'cli_profiles.yaml',
+            'memory.yaml',
+            'provider_credentials.yaml',
+        )),
+        ('ask_chatbot_config/schemas', config_files(
+            'schemas/workflow_schemas.yaml',
+        )),
     ],
     install_requires=[
         "agent_engine @ file:///home/ndev/agent_engine",
         "anthropic>=0.39.0",
+        "numpy>=1.22",
     ],
     extras_require={
+        'fast': [
+            'orjson>=3.9',
+        ],
+        'ann': [
+            'hnswlib>=0.7',
+        ],
         'dev': [
             'pytest>=7.4.0',
             'pytest-cov>=4.1.0',
@@ -37,10 +50,13 @@ setup(
             'mypy>=1.5.0',
         ],
     },
-    entry_points={
-        'console_scripts': [
-            'ask=main:main',
-        ],
-    },
+    # A plain script launches without the pkg_resources scan that setuptools'
+    # console_scripts wrappers can do on every start. Windows needs the .exe
+    # wrapper that only an entry point generates.
+    **(
+        {'entry_points': {'console_scripts': ['ask=main:main']}}
+        if sys.platform == 'win32'
+        else {'scripts': ['bin/ask']}
+    ),
     python_requires='>=3.8',
 )
@@ -1,9 +1,28 @@
 """Pytest configuration and shared fixtures"""
 
+import io
 import os
 import pytest
+import shutil
+import sys
 import tempfile
 from pathlib import Path
+from unittest.mock import patch
+
+# The modules under test live at the repository root, not in an installed package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def fresh_main_caches():
+    """Reset main's per-process caches (config directory, LLM clients) around every test."""
+    from main import get_config_dir, get_llm_client
+
+    get_config_dir.cache_clear()
+    get_llm_client.cache_clear()
+    yield
+    get_config_dir.cache_clear()
+    get_llm_client.cache_clear()
 
 
 @pytest.fixture
@@ -13,23 +32,33 @@ def temp_workspace():
         yield Path(tmpdir)
 
 
-@pytest.fixture
-def mock_codebase(temp_workspace):
-    """Create a mock codebase structure for testing."""
-    # Create some sample files
-    (temp_workspace / "README.md").write_text("# Test Project\n\nThis is a test project.")
-    (temp_workspace / "main.py").write_text("def main():\n    pass\n")
-
-    # Create a subdirectory
-    src_dir = temp_workspace / "src"
-    src_dir.mkdir()
-    (src_dir / "utils.py").write_text("def helper():\n    return 42\n")
-
-    # Create a config directory
-    config_dir = temp_workspace / "config"
-    config_dir.mkdir()
-    (config_dir / "settings.yaml").write_text("debug: true\n")
+MOCK_CODEBASE_FILES = (
+    ("README.md", b"# Test Project\n\nThis is a test project."),
+    ("main.py", b"def main():\n    pass\n"),
+    ("src/utils.py", b"def helper():\n    return 42\n"),
+    ("config/settings.yaml", b"debug: true\n"),
+)
 
+
+def _write_mock_codebase(root):
+    """Create a mock codebase structure under root."""
+    for rel, content in MOCK_CODEBASE_FILES:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return root
+
+
+@pytest.fixture(scope="session")
+def mock_codebase(tmp_path_factory):
+    """Mock codebase shared by the whole session; treat it as read-only."""
+    return _write_mock_codebase(tmp_path_factory.mktemp("mock_codebase"))
+
+
+@pytest.fixture
+def writable_codebase(mock_codebase, temp_workspace):
+    """Per-test copy of mock_codebase for tests that modify the workspace."""
+    shutil.copytree(mock_codebase, temp_workspace, dirs_exist_ok=True)
     return temp_workspace
 
 
@@ -39,6 +68,15 @@ def config_dir():
     return Path(__file__).parent.parent / "config"
 
 
+@pytest.fixture(scope="session")
+def engine():
+    """One agent_engine Engine built from config/ and shared by the whole session."""
+    agent_engine = pytest.importorskip("agent_engine")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AGENT_ENGINE_USE_ANTHROPIC", "1")
+        yield agent_engine.Engine.from_config_dir(str(Path(__file__).parent.parent / "config"))
+
+
 @pytest.fixture
 def enable_anthropic():
     """Enable Anthropic API for tests that need it."""
@@ -55,3 +93,37 @@ def enable_anthropic():
 def has_anthropic_key():
     """Check if Anthropic API key is available."""
     return bool(os.environ.get('ANTHROPIC_API_KEY'))
+
+
+class FakeHTTPConnection:
+    """Stand-in for http.client.HTTPConnection that answers from a handler."""
+
+    handler = None
+    instances = []
+
+    def __init__(self, netloc, timeout=None):
+        self.netloc = netloc
+        self.requests = []
+        self._body = b""
+        FakeHTTPConnection.instances.append(self)
+
+    def request(self, method, path, body=None, headers=None):
+        self.requests.append((method, path, body))
+        self._body = FakeHTTPConnection.handler(path, body)
+
+    def getresponse(self):
+        resp = io.BytesIO(self._body)
+        resp.status, resp.reason = 200, "OK"
+        return resp
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_http():
+    """Patch http.client.HTTPConnection; set `.handler(path, body) -> bytes` on the result."""
+    FakeHTTPConnection.instances = []
+    FakeHTTPConnection.handler = staticmethod(lambda path, body: b"{}")
+    with patch("http.client.HTTPConnection", FakeHTTPConnection):
+        yield FakeHTTPConnection
@@ -0,0 +1,16 @@
+"""Helpers shared by test modules (fixtures live in conftest.py)."""
+
+import functools
+import socket
+
+OLLAMA_ADDRESS = ("localhost", 11434)
+
+
+@functools.lru_cache(maxsize=1)
+def ollama_up():
+    """Whether something is listening on the Ollama port; probed once per session."""
+    try:
+        with socket.create_connection(OLLAMA_ADDRESS, timeout=0.1):
+            return True
+    except OSError:
+        return False
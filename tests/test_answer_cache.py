@@ -0,0 +1,63 @@
+"""Unit tests for answer_cache.py"""
+
+import subprocess
+import pytest
+from unittest.mock import patch
+
+from answer_cache import AnswerCache, workspace_fingerprint
+
+
+@pytest.fixture
+def git_workspace(writable_codebase):
+    """A copy of mock_codebase with its files tracked in a git repository."""
+    subprocess.run(["git", "init", "-q"], cwd=writable_codebase, check=True)
+    subprocess.run(["git", "add", "."], cwd=writable_codebase, check=True)
+    return writable_codebase
+
+
+class TestWorkspaceFingerprint:
+    """Tests for workspace_fingerprint function."""
+
+    @pytest.mark.unit
+    def test_changes_when_tracked_file_changes(self, git_workspace):
+        before = workspace_fingerprint(str(git_workspace))
+        assert workspace_fingerprint(str(git_workspace)) == before
+
+        (git_workspace / "main.py").write_text("def main():\n    return 1\n")
+
+        assert workspace_fingerprint(str(git_workspace)) != before
+
+    @pytest.mark.unit
+    def test_none_outside_git(self, temp_workspace):
+        assert workspace_fingerprint(str(temp_workspace)) is None
+
+
+class TestAnswerCache:
+    """Tests for AnswerCache class."""
+
+    @pytest.mark.unit
+    def test_round_trip(self, temp_workspace):
+        cache = AnswerCache(str(temp_workspace / "cache"))
+        key = AnswerCache.key("what is this?", ["haiku", "abc"])
+
+        assert cache.get(key) is None
+        cache.put(key, "An answer")
+
+        assert cache.get(key) == "An answer"
+        assert AnswerCache.key("what is this?", ["llama", "abc"]) != key
+
+    @pytest.mark.unit
+    def test_answer_question_reuses_cached_answer(self, git_workspace, monkeypatch):
+        from main import answer_question
+
+        monkeypatch.chdir(git_workspace)
+        monkeypatch.setenv("ASK_ANSWER_CACHE", "1")
+        monkeypatch.setenv("XDG_CACHE_HOME", str(git_workspace / ".cache"))
+
+        with patch("main.summarize_tool_results", return_value="Cached answer") as summarize, \
+                patch("tools.search_codebase_tool", return_value="results"):
+            first = answer_question("what is this?", "haiku")
+            second = answer_question("what is this?", "haiku")
+
+        assert first == second == "Cached answer"
+        assert summarize.call_count == 1
@@ -0,0 +1,14 @@
+"""Unit tests for config_loader.py"""
+
+import pytest
+
+from config_loader import parse_yaml
+
+
+class TestParseYaml:
+    """Tests for parse_yaml function."""
+
+    @pytest.mark.unit
+    def test_parses_yaml(self):
+        assert parse_yaml(b"memory:\n  enabled: true\n") == {"memory": {"enabled": True}}
+
@@ -1,12 +1,8 @@
 """Integration tests for help_chatbot with agent_engine"""
 
 import pytest
-import os
-import sys
-from pathlib import Path
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
+from tests.helpers import ollama_up
 
 
 class TestEngineIntegration:
@@ -193,7 +189,7 @@ class TestOllamaClient:
     @pytest.mark.integration
     @pytest.mark.slow
     @pytest.mark.skipif(
-        not os.system('curl -s http://localhost:11434/api/tags >/dev/null 2>&1') == 0,
+        not ollama_up(),
         reason="Ollama server not running"
     )
     def test_ollama_client_generate(self):
@@ -2,13 +2,9 @@
 
 import pytest
 from pathlib import Path
-import sys
 from unittest.mock import Mock, patch, MagicMock
 
-# Add parent directory to path
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from main import get_config_dir, get_model_profile
+from main import get_config_dir, get_model_profile, infer_focus_from_question
 
 
 class TestGetConfigDir:
@@ -37,6 +33,17 @@ class TestGetConfigDir:
         assert (config_dir / "agents.yaml").exists()
         assert (config_dir / "tools.yaml").exists()
 
+    @pytest.mark.unit
+    def test_get_config_dir_user_install(self, temp_workspace, monkeypatch):
+        """Test that configs installed with `pip install --user` are found."""
+        installed = temp_workspace / "userbase" / "ask_chatbot_config"
+        installed.mkdir(parents=True)
+        monkeypatch.setattr("site.USER_BASE", str(temp_workspace / "userbase"))
+
+        config_dir = get_config_dir(str(temp_workspace / "not_a_checkout"))
+
+        assert config_dir == str(installed)
+
 
 class TestGetModelProfile:
     """Tests for get_model_profile function."""
@@ -84,6 +91,33 @@ class TestGetModelProfile:
         profile = get_model_profile('haiku', profiles_config)
         assert profile is None
 
+    @pytest.mark.unit
+    def test_get_model_profile_first_duplicate_wins(self):
+        """Test that the first profile is returned when IDs repeat."""
+        profiles_config = {
+            'profiles': [
+                {'id': 'haiku', 'label': 'First'},
+                {'id': 'haiku', 'label': 'Second'},
+            ]
+        }
+
+        assert get_model_profile('haiku', profiles_config)['label'] == 'First'
+
+
+class TestInferFocusFromQuestion:
+    """Tests for infer_focus_from_question function."""
+
+    @pytest.mark.unit
+    def test_splits_on_commas_and_colons(self):
+        """Test that path and file tokens are found between separators."""
+        focus = infer_focus_from_question("compare src/app.py,setup.py:12 and README.md")
+        assert sorted(focus) == ["README.md", "setup.py", "src"]
+
+    @pytest.mark.unit
+    def test_defaults_without_path_tokens(self):
+        """Test that questions without paths fall back to the default areas."""
+        assert infer_focus_from_question("what does this project do") == ["src", "docs", "config", "tests"]
+
 
 class TestMainFunction:
     """Tests for main() function."""
@@ -159,6 +193,39 @@ class TestMainFunction:
         # Verify engine was created
         assert mock_engine_class.from_config_dir.called
 
+    @pytest.mark.unit
+    @patch('sys.argv', ['main.py'])
+    def test_main_repl_reuses_llm_client(self):
+        """Test that REPL turns share one LLM client instead of rebuilding it."""
+        from main import main
+
+        with patch('anthropic.Anthropic') as mock_anthropic, \
+                patch('tools.search_codebase_tool', return_value='results'), \
+                patch('builtins.input', side_effect=['q1', 'q2', 'exit']):
+            mock_anthropic.return_value.messages.create.return_value.content = [Mock(text='answer')]
+            main()
+
+        assert mock_anthropic.call_count == 1
+        assert mock_anthropic.return_value.messages.create.call_count == 2
+
+    @pytest.mark.unit
+    def test_summary_instructions_sent_as_cached_system_prompt(self):
+        """Test that the fixed instructions go in a cacheable system block."""
+        from main import SUMMARY_SYSTEM_PROMPT, summarize_tool_results
+
+        with patch('anthropic.Anthropic') as mock_anthropic:
+            create = mock_anthropic.return_value.messages.create
+            create.return_value.content = [Mock(text='answer')]
+            summarize_tool_results('q?', 'results', 'haiku')
+
+        kwargs = create.call_args.kwargs
+        assert kwargs['system'] == [{
+            'type': 'text',
+            'text': SUMMARY_SYSTEM_PROMPT,
+            'cache_control': {'type': 'ephemeral'},
+        }]
+        assert 'Ground rules' not in kwargs['messages'][0]['content']
+
     @pytest.mark.unit
     def test_main_config_dir_not_found(self):
         """Test behavior when config directory doesn't exist."""
@@ -0,0 +1,100 @@
+"""Unit tests for ollama_client.py"""
+
+import json
+import pytest
+
+from ollama_client import OllamaLLMClient
+
+
+def ndjson(*chunks):
+    return b"".join(json.dumps(c).encode("utf-8") + b"\n" for c in chunks)
+
+
+STREAM = [
+    {"model": "llama3", "response": "Hel", "done": False},
+    {"model": "llama3", "response": "lo", "done": False},
+    {"model": "llama3", "response": "", "done": True, "eval_count": 2},
+]
+# A model failure partway through generation.
+FAILED_STREAM = STREAM[:1] + [{"error": "model runner has unexpectedly stopped"}]
+
+
+class TestStreaming:
+    """Tests for streamed /api/generate handling."""
+
+    @pytest.mark.unit
+    def test_generate_accumulates_stream(self, fake_http):
+        fake_http.handler = staticmethod(lambda path, body: ndjson(*STREAM))
+        client = OllamaLLMClient(auto_pull=False)
+
+        result = client.generate({"prompt": "Say hello"})
+
+        method, path, body = fake_http.instances[0].requests[0]
+        assert (method, path) == ("POST", "/api/generate")
+        assert json.loads(body)["stream"] is True
+        assert result == "Hello"
+
+    @pytest.mark.unit
+    def test_stream_generate_yields_chunks(self, fake_http):
+        fake_http.handler = staticmethod(lambda path, body: ndjson(*STREAM))
+        client = OllamaLLMClient(auto_pull=False)
+
+        chunks = list(client.stream_generate({"prompt": "Say hello"}))
+
+        assert chunks == ["Hel", "lo"]
+
+    @pytest.mark.unit
+    def test_generate_raises_on_error_chunk(self, fake_http):
+        fake_http.handler = staticmethod(lambda path, body: ndjson(*FAILED_STREAM))
+        client = OllamaLLMClient(auto_pull=False)
+
+        with pytest.raises(RuntimeError, match="unexpectedly stopped"):
+            client.generate({"prompt": "Say hello"})
+
+    @pytest.mark.unit
+    def test_stream_generate_raises_on_error_chunk(self, fake_http):
+        fake_http.handler = staticmethod(lambda path, body: ndjson(*FAILED_STREAM))
+        client = OllamaLLMClient(auto_pull=False)
+
+        with pytest.raises(RuntimeError, match="unexpectedly stopped"):
+            list(client.stream_generate({"prompt": "Say hello"}))
+
+    @pytest.mark.unit
+    def test_requests_reuse_one_connection(self, fake_http):
+        fake_http.handler = staticmethod(lambda path, body: ndjson(*STREAM))
+        client = OllamaLLMClient(auto_pull=False)
+
+        client.generate("one")
+        client.generate("two")
+
+        assert len(fake_http.instances) == 1
+        assert len(fake_http.instances[0].requests) == 2
+
+    @pytest.mark.unit
+    def test_custom_transport_receives_stream_flag(self):
+        calls = []
+
+        def transport(url, headers, payload):
+            calls.append(payload)
+            return {"response": "ok"}
+
+        client = OllamaLLMClient(transport=transport, auto_pull=False)
+
+        assert client.generate("hi") == "ok"
+        assert list(client.stream_generate({"prompt": "hi"})) == ["ok"]
+        assert all(p["stream"] is True for p in calls)
+
+    @pytest.mark.unit
+    def test_system_prompt_sent_separately(self):
+        calls = []
+
+        def transport(url, headers, payload):
+            calls.append(payload)
+            return {"response": "ok"}
+
+        client = OllamaLLMClient(transport=transport, auto_pull=False)
+        client.generate({"prompt": "question", "system": "rules"})
+        client.generate({"prompt": "question", "system": None})
+
+        assert calls[0]["system"] == "rules"
+        assert "system" not in calls[1]
@@ -0,0 +1,539 @@
+"""Unit tests for rag.py"""
+
+import json
+import os
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+import rag
+from rag import (
+    ChunkTable,
+    OllamaEmbeddingProvider,
+    Retriever,
+    QueryVectorCache,
+    SimpleVectorStore,
+    _normalize_query,
+    cosine_similarity,
+    quantize_rows,
+)
+
+
+class KeywordEmbedder:
+    """Deterministic embedder: one dimension per keyword."""
+
+    KEYWORDS = ["alpha", "beta", "gamma", "delta"]
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts):
+        self.calls.append(list(texts))
+        return [
+            [float(text.lower().count(word)) + 0.01 for word in self.KEYWORDS]
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def rag_workspace(temp_workspace):
+    """Workspace with one file per keyword."""
+    for word in KeywordEmbedder.KEYWORDS:
+        (temp_workspace / f"{word}.md").write_text(f"{word} {word} {word}\n")
+    return temp_workspace
+
+
+def make_retriever(workspace, embedder=None):
+    store = SimpleVectorStore(str(workspace / ".agent_engine" / "rag_index.json"))
+    return Retriever(
+        workspace_root=str(workspace),
+        embedder=embedder or KeywordEmbedder(),
+        store=store,
+    )
+
+
+class TestRetriever:
+    """Tests for Retriever ranking."""
+
+    @pytest.mark.unit
+    def test_retrieve_ranks_best_match_first(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+
+        results = retriever.retrieve("gamma", top_k=2)
+
+        assert len(results) == 2
+        assert results[0].path == "gamma.md"
+        assert results[0].score >= results[1].score
+
+    @pytest.mark.unit
+    def test_retrieve_top_k_larger_than_index(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+
+        results = retriever.retrieve("beta", top_k=50)
+
+        assert len(results) == len(KeywordEmbedder.KEYWORDS)
+        assert results[0].path == "beta.md"
+
+    @pytest.mark.unit
+    def test_retrieve_reloads_persisted_index(self, rag_workspace):
+        make_retriever(rag_workspace).build_index()
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+
+        results = retriever.retrieve("delta", top_k=1)
+
+        # Only the query should be embedded; the index comes from disk.
+        assert embedder.calls == [["delta"]]
+        assert results[0].path == "delta.md"
+
+
+class TestDenseScoring:
+    """Tests for the cached float32 scoring matrix."""
+
+    @pytest.mark.unit
+    def test_dense_and_int8_scans_agree(self, rag_workspace, monkeypatch):
+        monkeypatch.setenv("ASK_PROXIMITY_CAP", "0")
+        dense = make_retriever(rag_workspace).retrieve("beta delta", top_k=4)
+        monkeypatch.setattr(rag, "DENSE_MATRIX_MAX_BYTES", 0)
+        scanned = make_retriever(rag_workspace).retrieve("beta delta", top_k=4)
+
+        assert [c.id for c in dense] == [c.id for c in scanned]
+        assert [c.score for c in dense] == pytest.approx([c.score for c in scanned], rel=1e-5)
+
+    @pytest.mark.unit
+    def test_rebuild_drops_dense_copy(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+        retriever.retrieve("gamma", top_k=1)
+        assert retriever._dense is not None
+
+        retriever.build_index()
+
+        assert retriever._dense is None
+
+
+class TestCosineSimilarity:
+    """Tests for the scalar cosine_similarity fallback."""
+
+    @pytest.mark.unit
+    def test_identical_vectors(self):
+        assert cosine_similarity([1.0, 2.0], [1.0, 2.0]) == pytest.approx(1.0)
+
+    @pytest.mark.unit
+    def test_mismatched_or_empty_vectors(self):
+        assert cosine_similarity([1.0], [1.0, 2.0]) == 0.0
+        assert cosine_similarity([], []) == 0.0
+        assert cosine_similarity([0.0, 0.0], [1.0, 1.0]) == 0.0
+
+
+class TestQuantization:
+    """Tests for int8 embedding quantization."""
+
+    @pytest.mark.unit
+    def test_rows_preserve_direction(self):
+        vectors = [[0.5, -1.0, 2.0, 0.0], [3.0, 0.0, 0.0, 1.0]]
+
+        matrix, scales = quantize_rows(vectors)
+
+        assert matrix.dtype == np.int8
+        for vec, row, scale in zip(vectors, matrix, scales):
+            decoded = (row.astype(np.float32) * scale).tolist()
+            assert cosine_similarity(vec, decoded) == pytest.approx(1.0, abs=1e-3)
+
+    @pytest.mark.unit
+    def test_zero_vector_row(self):
+        matrix, scales = quantize_rows([[0.0, 0.0]])
+
+        assert matrix.tolist() == [[0, 0]]
+        assert scales.tolist() == [0.0]
+
+
+class TestSimpleVectorStore:
+    """Tests for the JSON + .npy sidecar persistence."""
+
+    @pytest.mark.unit
+    def test_index_writes_vector_sidecar(self, rag_workspace):
+        make_retriever(rag_workspace).build_index()
+        index_dir = rag_workspace / ".agent_engine"
+
+        store = SimpleVectorStore(str(index_dir / "rag_index.json"))
+        chunks = store.load()
+
+        assert (index_dir / "rag_index.npy").exists()
+        assert "embedding" not in (index_dir / "rag_index.json").read_text()
+        assert store.matrix.shape == (len(chunks), len(KeywordEmbedder.KEYWORDS))
+
+    @pytest.mark.unit
+    def test_load_returns_columnar_table(self, rag_workspace):
+        built = make_retriever(rag_workspace).build_index()
+
+        table = SimpleVectorStore(str(rag_workspace / ".agent_engine" / "rag_index.json")).load()
+
+        assert isinstance(table, ChunkTable)
+        assert table.paths == [c.path for c in built]
+        assert table.start_lines.dtype == np.int32
+        assert table.row(0) == built[0]
+
+    @pytest.mark.unit
+    def test_load_reuses_parse_until_index_changes(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+        retriever.build_index()
+        store = SimpleVectorStore(str(rag_workspace / ".agent_engine" / "rag_index.json"))
+
+        first = store.load()
+        assert store.load() is first
+
+        (rag_workspace / "alpha.md").write_text("alpha beta\n")
+        retriever.build_index_incremental()
+
+        assert store.load() is not first
+
+    @pytest.mark.unit
+    def test_chunk_text_is_read_back_from_source(self, rag_workspace):
+        (rag_workspace / "notes.md").write_text("".join(f"beta line {i}\n" for i in range(130)))
+        retriever = make_retriever(rag_workspace)
+        retriever.build_index()
+
+        entries = json.loads((rag_workspace / ".agent_engine" / "rag_index.json").read_text())
+        results = retriever.retrieve("beta", top_k=3)
+
+        assert all("text" not in entry for entry in entries)
+        tail = next(c for c in results if c.id == "notes.md:121-130")
+        assert tail.text.splitlines() == [f"beta line {i}" for i in range(120, 130)]
+
+    @pytest.mark.unit
+    def test_legacy_index_without_sidecar_is_rebuilt(self, rag_workspace):
+        index_dir = rag_workspace / ".agent_engine"
+        index_dir.mkdir()
+        (index_dir / "rag_index.json").write_text(
+            '[{"id": "a.md:1-1", "path": "a.md", "start_line": 1, "end_line": 1,'
+            ' "text": "a", "embedding": [1.0, 0.0], "score": 0.0}]'
+        )
+
+        results = make_retriever(rag_workspace).retrieve("alpha", top_k=1)
+
+        assert results[0].path == "alpha.md"
+
+
+class TestOllamaEmbeddingProvider:
+    """Tests for OllamaEmbeddingProvider request fan-out."""
+
+    @staticmethod
+    def embed_by_length(path, body):
+        prompt = json.loads(body)["prompt"]
+        return json.dumps({"embedding": [float(len(prompt))]}).encode("utf-8")
+
+    @pytest.mark.unit
+    def test_embed_preserves_input_order(self, fake_http):
+        fake_http.handler = staticmethod(self.embed_by_length)
+        provider = OllamaEmbeddingProvider(base_url="http://ollama.test/api/embeddings", concurrency=4)
+        texts = ["a" * n for n in range(1, 20)]
+
+        vectors = provider.embed(texts)
+
+        assert vectors == [[float(n)] for n in range(1, 20)]
+        # One keep-alive connection per worker thread, not one per request.
+        assert len(fake_http.instances) <= 4
+
+    @pytest.mark.unit
+    def test_connections_survive_across_calls(self, fake_http):
+        fake_http.handler = staticmethod(self.embed_by_length)
+        provider = OllamaEmbeddingProvider(base_url="http://ollama.test/api/embeddings", concurrency=4)
+
+        for _ in range(3):
+            provider.embed(["a" * n for n in range(1, 20)])
+
+        # Worker threads (and their keep-alive connections) are reused between batches.
+        assert len(fake_http.instances) <= 4
+
+    @pytest.mark.unit
+    def test_concurrency_from_env(self, monkeypatch):
+        monkeypatch.setenv("OLLAMA_EMBED_CONCURRENCY", "2")
+
+        provider = OllamaEmbeddingProvider()
+
+        assert provider.concurrency == 2
+
+
+class TestProximityCache:
+    """Tests for the near-duplicate query cache on Retriever."""
+
+    @pytest.mark.unit
+    def test_near_duplicate_query_reuses_results(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+        first = retriever.retrieve("gamma", top_k=2)
+
+        second = retriever.retrieve("gamma gamma", top_k=2)
+
+        # A hit returns the stored result without appending a new entry.
+        assert len(retriever._cache) == 1
+        assert [c.id for c in second] == [c.id for c in first]
+
+    @pytest.mark.unit
+    def test_distinct_query_misses(self, rag_workspace):
+        retriever = make_retriever(rag_workspace)
+        retriever.retrieve("gamma", top_k=2)
+
+        results = retriever.retrieve("alpha", top_k=1)
+
+        assert len(retriever._cache) == 2
+        assert results[0].path == "alpha.md"
+
+    @pytest.mark.unit
+    def test_cache_disabled_by_env(self, rag_workspace, monkeypatch):
+        monkeypatch.setenv("ASK_PROXIMITY_CAP", "0")
+        retriever = make_retriever(rag_workspace)
+
+        retriever.retrieve("gamma", top_k=2)
+
+        assert len(retriever._cache) == 0
+
+
+class TestQueryCache:
+    """Tests for the exact query-text cache on Retriever."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("a,b", [
+        ("What is  gamma?", "what is gamma"),
+        ("gamma!", "Gamma."),
+    ])
+    def test_normalization_merges(self, a, b):
+        assert _normalize_query(a) == _normalize_query(b)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("a,b", [
+        ("__init__", "init"),
+        ("C++", "c"),
+        (".env", "env"),
+        ("--verbose flag", "verbose flag"),
+    ])
+    def test_normalization_keeps_identifiers(self, a, b):
+        assert _normalize_query(a) != _normalize_query(b)
+
+    @pytest.mark.unit
+    def test_repeated_query_skips_embedding(self, rag_workspace):
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+        first = retriever.retrieve("Gamma  delta", top_k=2)
+        calls = len(embedder.calls)
+
+        second = retriever.retrieve("gamma delta?", top_k=1)
+
+        assert len(embedder.calls) == calls
+        assert second == first[:1]
+
+    @pytest.mark.unit
+    def test_rebuilt_index_invalidates(self, rag_workspace, monkeypatch):
+        monkeypatch.setenv("ASK_QUERY_VECTOR_CACHE", "0")
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+        retriever.retrieve("gamma", top_k=1)
+
+        (rag_workspace / "alpha.md").write_text("gamma gamma gamma gamma\n")
+        retriever.build_index_incremental()
+        calls = len(embedder.calls)
+        results = retriever.retrieve("gamma", top_k=1)
+
+        assert len(embedder.calls) == calls + 1
+        assert results[0].path == "alpha.md"
+
+    @pytest.mark.unit
+    def test_query_vector_reused_across_retrievers(self, rag_workspace):
+        embedder = KeywordEmbedder()
+        first = make_retriever(rag_workspace, embedder).retrieve("gamma", top_k=1)
+        calls = len(embedder.calls)
+
+        second = make_retriever(rag_workspace, embedder).retrieve("GAMMA", top_k=1)
+
+        assert len(embedder.calls) == calls
+        assert second == first
+
+    @pytest.mark.unit
+    def test_query_vector_cache_evicts_least_recent(self, tmp_path):
+        cache = QueryVectorCache(str(tmp_path), "model", max_entries=2)
+        cache.put("a", [1.0, 0.0])
+        cache.put("b", [0.0, 1.0])
+        os.utime(cache._path("b"), ns=(0, 0))
+        assert cache.get("a") is not None
+
+        cache.put("c", [1.0, 1.0])
+
+        assert cache.get("b") is None
+        assert list(cache.get("c")) == [1.0, 1.0]
+        assert QueryVectorCache(str(tmp_path), "other", 2).get("a") is None
+
+
+class TestBuildIndex:
+    """Tests for Retriever.build_index chunking."""
+
+    @pytest.mark.unit
+    def test_parallel_chunking_matches_serial(self, rag_workspace, monkeypatch):
+        (rag_workspace / "long.py").write_text("".join(f"line {i}\n" for i in range(300)))
+        serial = make_retriever(rag_workspace).build_index()
+
+        monkeypatch.setattr("rag.PARALLEL_CHUNK_MIN_FILES", 0)
+        parallel = make_retriever(rag_workspace).build_index()
+
+        assert sorted(c.id for c in parallel) == sorted(c.id for c in serial)
+        assert "long.py:121-240" in {c.id for c in parallel}
+
+    @pytest.mark.unit
+    def test_worker_error_is_not_treated_as_pool_failure(self, rag_workspace, monkeypatch, caplog):
+        monkeypatch.setattr("rag.PARALLEL_CHUNK_MIN_FILES", 0)
+        gone = str(rag_workspace / "gone.md")
+
+        with pytest.raises(FileNotFoundError):
+            list(make_retriever(rag_workspace)._iter_file_chunks(["gone.md"], [gone]))
+
+        assert "chunking serially" not in caplog.text
+
+    @pytest.mark.unit
+    def test_skips_excluded_directories(self, rag_workspace):
+        for name in ("venv", ".venv", "node_modules", ".mypy_cache"):
+            (rag_workspace / name).mkdir()
+            (rag_workspace / name / "site.py").write_text("alpha\n")
+        (rag_workspace / "venv_helpers.py").write_text("alpha\n")
+
+        paths = {c.path for c in make_retriever(rag_workspace).build_index()}
+
+        assert "venv_helpers.py" in paths
+        assert not any(p.split("/")[0] in ("venv", ".venv", "node_modules", ".mypy_cache") for p in paths)
+
+    @pytest.mark.unit
+    def test_chunks_are_embedded_in_batches(self, rag_workspace, monkeypatch):
+        monkeypatch.setattr("rag.EMBED_BATCH_SIZE", 3)
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+
+        chunks = retriever.build_index()
+
+        assert [len(batch) for batch in embedder.calls] == [3, 1]
+        assert retriever.store.matrix.shape == (4, 4)
+        assert [c.path for c in retriever.retrieve("gamma", top_k=1)] == ["gamma.md"]
+        assert len(chunks) == 4
+
+    @pytest.mark.unit
+    def test_embedding_failure_propagates(self, rag_workspace, monkeypatch):
+        monkeypatch.setattr("rag.EMBED_BATCH_SIZE", 1)
+        monkeypatch.setattr("rag.EMBED_QUEUE_DEPTH", 1)
+
+        class FailingEmbedder:
+            def embed(self, texts):
+                raise RuntimeError("ollama down")
+
+        with pytest.raises(RuntimeError, match="ollama down"):
+            make_retriever(rag_workspace, FailingEmbedder()).build_index()
+
+
+class TestIncrementalIndex:
+    """Tests for Retriever.build_index_incremental."""
+
+    @pytest.mark.unit
+    def test_only_modified_files_are_embedded(self, rag_workspace):
+        make_retriever(rag_workspace).build_index()
+        changed = rag_workspace / "beta.md"
+        changed.write_text("beta gamma\n")
+        os.utime(changed, (4_000_000_000, 4_000_000_000))
+        (rag_workspace / "gamma.md").unlink()
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+
+        chunks = retriever.build_index_incremental()
+
+        assert embedder.calls == [["beta gamma\n"]]
+        assert sorted(c.path for c in chunks) == ["alpha.md", "beta.md", "delta.md"]
+        assert retriever.retrieve("alpha", top_k=1)[0].path == "alpha.md"
+
+    @pytest.mark.unit
+    def test_without_existing_index_builds_everything(self, rag_workspace):
+        embedder = KeywordEmbedder()
+
+        chunks = make_retriever(rag_workspace, embedder).build_index_incremental()
+
+        assert len(chunks) == len(KeywordEmbedder.KEYWORDS)
+        assert len(embedder.calls[0]) == len(KeywordEmbedder.KEYWORDS)
+
+    @pytest.mark.unit
+    def test_touched_file_with_same_content_is_not_reembedded(self, rag_workspace):
+        make_retriever(rag_workspace).build_index()
+        os.utime(rag_workspace / "alpha.md", (4_000_000_000, 4_000_000_000))
+        embedder = KeywordEmbedder()
+
+        chunks = make_retriever(rag_workspace, embedder).build_index_incremental()
+
+        assert embedder.calls == []
+        alpha = next(c for c in chunks if c.path == "alpha.md")
+        assert alpha.modified_time == 4_000_000_000
+
+    @pytest.mark.unit
+    def test_retrieve_refreshes_index_after_edit(self, rag_workspace, monkeypatch):
+        monkeypatch.setattr("rag.INDEX_CHECK_INTERVAL", 0)
+        embedder = KeywordEmbedder()
+        retriever = make_retriever(rag_workspace, embedder)
+        assert retriever.retrieve("gamma", top_k=1)[0].path == "gamma.md"
+
+        edited = rag_workspace / "alpha.md"
+        edited.write_text("gamma gamma gamma gamma\n")
+        os.utime(edited, (4_000_000_000, 4_000_000_000))
+        (rag_workspace / "delta.md").unlink()
+        calls = len(embedder.calls)
+
+        results = retriever.retrieve("gamma", top_k=4)
+
+        assert embedder.calls[calls] == ["gamma gamma gamma gamma\n"]
+        assert results[0].path == "alpha.md"
+        assert "delta.md" not in {c.path for c in results}
+
+    @pytest.mark.unit
+    def test_unchanged_workspace_is_not_reindexed(self, rag_workspace, monkeypatch):
+        monkeypatch.setattr("rag.INDEX_CHECK_INTERVAL", 0)
+        retriever = make_retriever(rag_workspace)
+        retriever.retrieve("gamma", top_k=1)
+        (rag_workspace / "empty.md").write_text("\n")
+        retriever.retrieve("beta", top_k=1)
+
+        with patch.object(retriever, "build_index_incremental") as rebuild:
+            retriever.retrieve("alpha", top_k=1)
+
+        rebuild.assert_not_called()
+
+    @pytest.mark.unit
+    def test_file_deleted_after_walk_is_dropped(self, rag_workspace, monkeypatch):
+        retriever = make_retriever(rag_workspace)
+        retriever.build_index()
+        rels, paths = retriever._collect_files()
+        (rag_workspace / "gamma.md").unlink()
+        monkeypatch.setattr(retriever, "_collect_files", lambda: (rels, paths))
+
+        chunks = retriever.build_index_incremental()
+
+        assert sorted(c.path for c in chunks) == ["alpha.md", "beta.md", "delta.md"]
+
+
+@pytest.mark.skipif(rag.hnswlib is None, reason="hnswlib not installed")
+class TestAnnIndex:
+    """Tests for the optional HNSW index."""
+
+    @pytest.mark.unit
+    def test_ann_matches_brute_force(self, rag_workspace, monkeypatch):
+        brute = [c.id for c in make_retriever(rag_workspace).retrieve("gamma", top_k=3)]
+        monkeypatch.setattr("rag.ANN_MIN_ROWS", 1)
+        retriever = make_retriever(rag_workspace)
+        retriever.build_index()
+
+        results = retriever.retrieve("gamma", top_k=3)
+
+        assert (rag_workspace / ".agent_engine" / "rag_index.hnsw").exists()
+        assert retriever.store.ann() is not None
+        assert [c.id for c in results] == brute
+
+    @pytest.mark.unit
+    def test_small_index_drops_graph(self, rag_workspace, monkeypatch):
+        monkeypatch.setattr("rag.ANN_MIN_ROWS", 1)
+        make_retriever(rag_workspace).build_index()
+        monkeypatch.setattr("rag.ANN_MIN_ROWS", 2000)
+
+        retriever = make_retriever(rag_workspace)
+        retriever.build_index()
+
+        assert not (rag_workspace / ".agent_engine" / "rag_index.hnsw").exists()
+        assert retriever.store.ann() is None
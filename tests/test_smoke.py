@@ -0,0 +1,62 @@
+"""End-to-end smoke runs of the agent_engine workflow (formerly the root-level test_*.py scripts)."""
+
+import os
+import pytest
+
+from tests.helpers import ollama_up
+
+pytest.importorskip("agent_engine")
+
+pytestmark = [pytest.mark.integration, pytest.mark.slow]
+
+
+def _answer_node(result):
+    return next((n for n in result["history"] if n["node_id"] == "answer_question"), None)
+
+
+@pytest.fixture
+def llm_engine(engine, request):
+    """The session engine with the LLM client for `request.param` swapped in."""
+    client = request.param
+    original = engine.agent_runtime.llm_client
+    if client == "anthropic":
+        if not os.environ.get("ANTHROPIC_API_KEY"):
+            pytest.skip("ANTHROPIC_API_KEY not set")
+        if original is None:
+            pytest.skip("LLM client not initialized")
+    elif client == "ollama":
+        if not ollama_up():
+            pytest.skip("Ollama server not running")
+        from ollama_client import OllamaLLMClient
+
+        engine.agent_runtime.llm_client = OllamaLLMClient(model="llama3.2:1b")
+    yield engine
+    engine.agent_runtime.llm_client = original
+
+
+@pytest.mark.requires_api
+@pytest.mark.parametrize(
+    "user_input,llm_engine",
+    [
+        ("hello", "anthropic"),
+        ("What files are in this project?", "ollama"),
+    ],
+    indirect=["llm_engine"],
+)
+def test_workflow_answers(llm_engine, user_input):
+    result = llm_engine.run({"user_input": user_input})
+
+    assert result["status"] == "success"
+    assert "output" in result
+    assert result["history"]
+
+
+@pytest.mark.requires_api
+@pytest.mark.parametrize("llm_engine", ["anthropic", "ollama"], indirect=True)
+def test_codebase_question_reaches_search_tool(llm_engine):
+    result = llm_engine.run({"user_input": "What files are in this codebase?"})
+
+    node = _answer_node(result)
+    assert node is not None
+    assert not node.get("error")
+    assert "tool_plan" in node or "tool_calls" in node
@@ -1,24 +1,38 @@
 """Unit tests for tools.py"""
 
+import base64
+import json
+import os
 import pytest
-from pathlib import Path
-import sys
-
-# Add parent directory to path so we can import tools
-sys.path.insert(0, str(Path(__file__).parent.parent))
-
-from tools import search_codebase_tool, format_response_tool
+import subprocess
+import threading
+from unittest.mock import patch
+
+from config_loader import parse_yaml
+from tools import (
+    search_codebase_tool,
+    format_response_tool,
+    _format_rg_events,
+    _gather_direct_file_snippets,
+    _iter_workspace,
+    _list_workspace,
+    _run_ripgrep,
+    _search_snippets,
+    _load_rag_settings,
+    _mtime_ns,
+    _run_rag,
+)
 
 
 class TestSearchCodebaseTool:
     """Tests for search_codebase_tool function."""
 
     @pytest.mark.unit
-    def test_search_codebase_basic(self, mock_codebase):
+    def test_search_codebase_basic(self, writable_codebase):
         """Test basic codebase search functionality."""
         result = search_codebase_tool(
             query="test",
-            workspace_root=str(mock_codebase)
+            workspace_root=str(writable_codebase)
         )
 
         assert "**Project File Listing:**" in result
@@ -27,29 +41,29 @@ class TestSearchCodebaseTool:
         assert "main.py" in result
 
     @pytest.mark.unit
-    def test_search_codebase_finds_readme(self, mock_codebase):
+    def test_search_codebase_finds_readme(self, writable_codebase):
         """Test that README content is extracted."""
         result = search_codebase_tool(
             query="project",
-            workspace_root=str(mock_codebase)
+            workspace_root=str(writable_codebase)
         )
 
         assert "Test Project" in result
         assert "This is a test project" in result
 
     @pytest.mark.unit
-    def test_search_codebase_excludes_common_dirs(self, mock_codebase):
+    def test_search_codebase_excludes_common_dirs(self, writable_codebase):
         """Test that .git, venv, and __pycache__ are excluded."""
         # Create directories that should be excluded
-        (mock_codebase / ".git").mkdir()
-        (mock_codebase / ".git" / "config").write_text("git config")
-        (mock_codebase / "venv").mkdir()
-        (mock_codebase / "venv" / "lib").mkdir()
-        (mock_codebase / "__pycache__").mkdir()
+        (writable_codebase / ".git").mkdir()
+        (writable_codebase / ".git" / "config").write_text("git config")
+        (writable_codebase / "venv").mkdir()
+        (writable_codebase / "venv" / "lib").mkdir()
+        (writable_codebase / "__pycache__").mkdir()
 
         result = search_codebase_tool(
             query="test",
-            workspace_root=str(mock_codebase)
+            workspace_root=str(writable_codebase)
         )
 
         # These directories should NOT appear in the results
@@ -57,6 +71,40 @@ class TestSearchCodebaseTool:
         assert "venv" not in result
         assert "__pycache__" not in result
 
+    @pytest.mark.unit
+    def test_prefers_conventional_root_readme(self, writable_codebase):
+        """Test that README.md wins over other files that mention readme."""
+        (writable_codebase / "CHANGELOG_readme.txt").write_text("Old notes")
+
+        result = search_codebase_tool(query="", workspace_root=str(writable_codebase))
+
+        assert "## README\n# Test Project" in result
+
+    @pytest.mark.unit
+    def test_large_readme_is_capped(self, temp_workspace):
+        """Test that only the first 64 KiB of the README reach the prompt."""
+        (temp_workspace / "README.md").write_text("x" * 100_000)
+
+        result = search_codebase_tool(query="", workspace_root=str(temp_workspace))
+
+        assert "x" * 65_536 in result
+        assert "x" * 65_537 not in result
+
+    @pytest.mark.unit
+    def test_sections_in_order(self, temp_workspace):
+        """Test that every section is present, in a fixed order, with its fallback text."""
+        result = search_codebase_tool(query="", workspace_root=str(temp_workspace))
+
+        assert result == (
+            "## Query\n\n\n"
+            "## Search Snippets\nNo query provided.\n\n"
+            "## RAG Snippets\nRAG disabled or no matches found.\n\n"
+            "## RAG Status\nRAG skipped (empty query).\n\n"
+            "## Direct File Snippets\nNo direct file references found in the query.\n\n"
+            "## README\nNo README file found.\n\n"
+            "## Project File Listing (partial)\nNo files were listed."
+        )
+
     @pytest.mark.unit
     def test_search_codebase_no_readme(self, temp_workspace):
         """Test behavior when no README exists."""
@@ -72,18 +120,50 @@ class TestSearchCodebaseTool:
         assert "No README file found" in result
 
     @pytest.mark.unit
-    def test_search_codebase_with_focus_areas(self, mock_codebase):
+    def test_search_codebase_with_focus_areas(self, writable_codebase):
         """Test search with focus_areas parameter."""
         result = search_codebase_tool(
             query="config",
             focus_areas=["config", "settings"],
-            workspace_root=str(mock_codebase)
+            workspace_root=str(writable_codebase)
         )
 
         assert "**Project File Listing:**" in result
         # Should find config directory
         assert "config" in result
 
+    @pytest.mark.unit
+    def test_blank_query_skips_searches(self, mock_codebase):
+        """Test that a whitespace-only query lists the project without searching."""
+        with patch("tools._run_rag") as run_rag, patch("tools._run_ripgrep") as run_rg:
+            result = search_codebase_tool(query="   ", workspace_root=str(mock_codebase))
+
+        run_rag.assert_not_called()
+        run_rg.assert_not_called()
+        assert "## Search Snippets\nNo query provided." in result
+        assert "## RAG Status\nRAG skipped (empty query)." in result
+        assert "Test Project" in result
+
+    @pytest.mark.unit
+    def test_rag_and_content_search_run_concurrently(self, mock_codebase):
+        """Test that RAG and rg overlap instead of running back to back."""
+        both_running = threading.Barrier(2, timeout=5)
+
+        def fake_rag(query, cwd, meta):
+            both_running.wait()
+            return "rag hit", "RAG completed."
+
+        def fake_search(query, cwd, focus_areas, regex):
+            both_running.wait()
+            return "rg hit"
+
+        with patch("tools._run_rag", side_effect=fake_rag), \
+                patch("tools._search_snippets", side_effect=fake_search):
+            result = search_codebase_tool(query="main", workspace_root=str(mock_codebase))
+
+        assert "## Search Snippets\nrg hit" in result
+        assert "## RAG Snippets\nrag hit" in result
+
     @pytest.mark.unit
     def test_search_codebase_error_handling(self):
         """Test error handling with invalid workspace."""
@@ -99,6 +179,333 @@ class TestSearchCodebaseTool:
         assert "**README:**" in result
 
 
+class TestIterWorkspace:
+    """Tests for _iter_workspace function."""
+
+    @pytest.mark.unit
+    def test_prunes_excluded_dirs_by_name(self, writable_codebase):
+        (writable_codebase / "node_modules" / "pkg").mkdir(parents=True)
+        (writable_codebase / "node_modules" / "pkg" / "index.js").write_text("")
+        (writable_codebase / ".git").mkdir()
+        (writable_codebase / "src" / "develop_venv.py").write_text("")
+
+        listed = {
+            os.path.relpath(path, writable_codebase): is_dir
+            for path, is_dir in _iter_workspace(str(writable_codebase))
+        }
+
+        assert listed["src"] is True
+        assert listed[os.path.join("src", "develop_venv.py")] is False
+        assert not any(p.startswith(("node_modules", ".git")) for p in listed)
+
+
+class TestListWorkspace:
+    """Tests for _list_workspace caching."""
+
+    @pytest.mark.unit
+    def test_relists_when_root_changes(self, writable_codebase):
+        root = str(writable_codebase)
+        first = _list_workspace(root, _mtime_ns(root))
+        assert _list_workspace(root, _mtime_ns(root)) is first
+
+        (writable_codebase / "new.py").write_text("")
+
+        files, total, readme, complete = _list_workspace(root, _mtime_ns(root))
+        assert os.path.join(root, "new.py") in files
+        assert total == first[1] + 1
+        assert readme == os.path.join(root, "README.md")
+
+    @pytest.mark.unit
+    def test_walk_stops_counting_at_limit(self, writable_codebase, monkeypatch):
+        monkeypatch.setattr("tools.shutil.which", lambda name: None)
+        monkeypatch.setattr("tools.MAX_LISTED_FILES", 2)
+        monkeypatch.setattr("tools.LISTING_COUNT_LIMIT", 3)
+
+        result = search_codebase_tool(query="", workspace_root=str(writable_codebase))
+
+        assert "... and more than 1 more files" in result
+
+
+    @pytest.mark.unit
+    def test_uses_rg_files_when_available(self, writable_codebase):
+        root = str(writable_codebase)
+        listed = "\n".join([
+            os.path.join(root, "src", "utils.py"),
+            os.path.join(root, "docs", "README.md"),
+            os.path.join(root, "README.md"),
+            os.path.join(root, "main.py"),
+        ])
+        completed = subprocess.CompletedProcess([], 0, stdout=(listed + "\n").encode(), stderr=None)
+
+        with patch("tools.shutil.which", return_value="/usr/bin/rg"), \
+                patch("tools.subprocess.run", return_value=completed) as run:
+            files, total, readme, complete = _list_workspace(root, -1)
+
+        assert run.call_args[0][0][:2] == ["/usr/bin/rg", "--files"]
+        assert files[:2] == (os.path.join(root, "README.md"), os.path.join(root, "main.py"))
+        assert total == 4
+        assert readme == os.path.join(root, "README.md")
+
+
+class TestRunRipgrep:
+    """Tests for _run_ripgrep function."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("regex,literal", [(False, True), (True, False)])
+    def test_query_is_literal_unless_regex(self, regex, literal):
+        with patch("tools.subprocess.Popen") as popen:
+            popen.return_value.__enter__.return_value.stdout = []
+            _run_ripgrep("/usr/bin/rg", "a.b(", ["/src"], regex=regex)
+
+        cmd = popen.call_args[0][0]
+        assert ("--fixed-strings" in cmd) is literal
+        assert cmd[-3:] == ["--", "a.b(", "/src"]
+
+
+    @pytest.mark.unit
+    def test_slow_search_is_cut_off(self, temp_workspace, monkeypatch):
+        match = json.dumps({
+            "type": "match",
+            "data": {"path": {"text": "a.py"}, "lines": {"text": "hit\n"}, "line_number": 3},
+        })
+        slow_rg = temp_workspace / "rg"
+        slow_rg.write_text(f"#!/bin/sh\nprintf '%s\\n' '{match}'\nexec sleep 30\n")
+        slow_rg.chmod(0o755)
+        monkeypatch.setattr("tools.RG_TIMEOUT_SECONDS", 0.2)
+
+        result = _run_ripgrep(str(slow_rg), "hit", [str(temp_workspace)])
+
+        assert result.startswith("a.py:3:hit\n\n(search timed out after 0.2s")
+
+
+class TestSearchSnippets:
+    """Tests for _search_snippets focus-area handling."""
+
+    @pytest.mark.unit
+    def test_overlapping_areas_searched_once(self, mock_codebase):
+        root = str(mock_codebase)
+        with patch("tools.shutil.which", return_value="/usr/bin/rg"), \
+                patch("tools._run_ripgrep", return_value="") as run_rg:
+            _search_snippets("x", root, ["src", "./src/", "config", root, "missing"], False)
+
+        assert run_rg.call_args[0][2] == [root]
+
+    @pytest.mark.unit
+    def test_sibling_areas_kept(self, mock_codebase):
+        root = str(mock_codebase)
+        with patch("tools.shutil.which", return_value="/usr/bin/rg"), \
+                patch("tools._run_ripgrep", return_value="") as run_rg:
+            _search_snippets("x", root, ["src", "config"], False)
+
+        assert run_rg.call_args[0][2] == [os.path.join(root, "src"), os.path.join(root, "config")]
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("env,expected", [("1.5", 1.5), ("", 5), ("soon", 5), ("0", 5)])
+    def test_timeout_from_environment(self, mock_codebase, monkeypatch, env, expected):
+        monkeypatch.setenv("ASK_RG_TIMEOUT", env)
+        with patch("tools.shutil.which", return_value="/usr/bin/rg"), \
+                patch("tools._run_ripgrep", return_value="") as run_rg:
+            _search_snippets("x", str(mock_codebase), None, False)
+
+        assert run_rg.call_args[1]["timeout"] == expected
+
+    @pytest.mark.unit
+    def test_nested_edit_seen_by_next_search(self, writable_codebase):
+        root = str(writable_codebase)
+        with patch("tools.shutil.which", return_value="/usr/bin/rg"), \
+                patch("tools._run_ripgrep", side_effect=["before", "after"]) as run_rg:
+            assert _search_snippets("x", root, None, False) == "before"
+            (writable_codebase / "src" / "utils.py").write_text("x = 2\n")
+
+            assert _search_snippets("x", root, None, False) == "after"
+
+        assert run_rg.call_count == 2
+
+
+class TestFormatRgEvents:
+    """Tests for _format_rg_events function."""
+
+    @staticmethod
+    def _event(kind, path, line_number=None, text=None):
+        data = {"path": {"text": path}}
+        if line_number is not None:
+            data.update(line_number=line_number, lines=text)
+        return json.dumps({"type": kind, "data": data}).encode() + b"\n"
+
+    @pytest.mark.unit
+    def test_renders_matches_and_context_per_file(self):
+        stream = [
+            self._event("begin", "a.py"),
+            self._event("context", "a.py", 1, {"text": "import os\n"}),
+            self._event("match", "a.py", 2, {"text": "def main():\n"}),
+            self._event("end", "a.py"),
+            self._event("begin", "b.py"),
+            self._event("match", "b.py", 7, {"bytes": base64.b64encode(b"main = 1\n").decode()}),
+            self._event("end", "b.py"),
+            json.dumps({"type": "summary", "data": {}}).encode(),
+        ]
+
+        assert _format_rg_events(stream) == (
+            "a.py-1-import os\na.py:2:def main():\n\nb.py:7:main = 1",
+            False,
+        )
+
+    @pytest.mark.unit
+    def test_no_events(self):
+        assert _format_rg_events([]) == ("", False)
+
+    @pytest.mark.unit
+    def test_stops_after_max_files_and_trims_long_lines(self):
+        stream = []
+        for name in ("a.py", "b.py", "c.py"):
+            stream += [
+                self._event("match", name, 1, {"text": "x" * 400 + "\n"}),
+                self._event("end", name),
+            ]
+
+        text, truncated = _format_rg_events(iter(stream), max_files=2)
+
+        assert truncated
+        assert text == "\n\n".join(f"{n}:1:{'x' * 300} [...]" for n in ("a.py", "b.py"))
+
+    @pytest.mark.unit
+    def test_exactly_max_files_is_not_truncated(self):
+        stream = []
+        for name in ("a.py", "b.py"):
+            stream += [
+                self._event("begin", name),
+                self._event("match", name, 1, {"text": "hit\n"}),
+                self._event("end", name),
+            ]
+        stream.append(json.dumps({"type": "summary", "data": {}}).encode() + b"\n")
+
+        assert _format_rg_events(iter(stream), max_files=2) == ("a.py:1:hit\n\nb.py:1:hit", False)
+
+
+class TestGatherDirectFileSnippets:
+    """Tests for _gather_direct_file_snippets function."""
+
+    @pytest.mark.unit
+    def test_same_file_named_twice_is_read_once(self, mock_codebase):
+        result = _gather_direct_file_snippets("compare main.py with ./main.py", str(mock_codebase))
+
+        assert result == "main.py:1-2\n1: def main():\n2:     pass"
+
+    @pytest.mark.unit
+    def test_resolves_under_default_roots_in_token_order(self, mock_codebase):
+        result = _gather_direct_file_snippets("see utils.py then README.md", str(mock_codebase))
+
+        utils, readme = result.split("\n\n", 1)
+        assert utils.startswith(os.path.join("src", "utils.py") + ":1-2\n")
+        assert readme.startswith("README.md:1-3\n1: # Test Project")
+
+    @pytest.mark.unit
+    def test_long_file_truncated_to_200_lines(self, temp_workspace):
+        (temp_workspace / "big.py").write_text("".join(f"x = {i}\n" for i in range(300)))
+
+        result = _gather_direct_file_snippets("explain big.py", str(temp_workspace))
+
+        assert result.startswith("big.py:1-200\n1: x = 0\n")
+        assert result.endswith("\n200: x = 199")
+
+    @pytest.mark.unit
+    def test_joins_directory_token_with_next_token(self, temp_workspace):
+        (temp_workspace / "lib").mkdir()
+        (temp_workspace / "lib" / "x.py").write_text("y = 1\n")
+
+        result = _gather_direct_file_snippets("look in lib/ x.py", str(temp_workspace))
+
+        assert result == os.path.join("lib", "x.py") + ":1-1\n1: y = 1"
+
+    @pytest.mark.unit
+    def test_no_file_tokens(self, mock_codebase):
+        assert _gather_direct_file_snippets("what does this do?", str(mock_codebase)) == ""
+
+
+class TestRunRag:
+    """Tests for _run_rag retriever reuse."""
+
+    @pytest.mark.unit
+    def test_reuses_retriever_until_index_rewritten(self, temp_workspace, monkeypatch):
+        created = []
+
+        class FakeRetriever:
+            def __init__(self, embedder, **kwargs):
+                self.embedder = embedder
+                created.append(self)
+
+            def retrieve(self, query, top_k):
+                return []
+
+        monkeypatch.setattr("rag.Retriever", FakeRetriever)
+        monkeypatch.setattr("rag.OllamaEmbeddingProvider", object)
+        root = str(temp_workspace)
+
+        assert _run_rag("q", root, {"top_k": 2})[1] == "RAG completed (no matches)."
+        _run_rag("q", root, {"top_k": 2})
+        assert len(created) == 1
+
+        (temp_workspace / ".agent_engine" / "rag_index.json").write_text("[]")
+        _run_rag("q", root, {"top_k": 2})
+        assert len(created) == 2
+        assert created[1].embedder is created[0].embedder
+
+
+class TestLoadRagSettings:
+    """Tests for _load_rag_settings caching."""
+
+    RAG_YAML = (
+        "memory:\n"
+        "  context_profiles:\n"
+        "    - id: rag_profile\n"
+        "      metadata:\n"
+        "        rag_enabled: {enabled}\n"
+        "        rag_top_k: {top_k}\n"
+    )
+
+    @pytest.mark.unit
+    def test_defaults_without_config(self, temp_workspace):
+        assert _load_rag_settings(str(temp_workspace)) == {"enabled": True, "top_k": 6}
+
+    @pytest.mark.unit
+    def test_reloads_when_config_changes(self, temp_workspace):
+        cfg = temp_workspace / "config" / "memory.yaml"
+        cfg.parent.mkdir()
+        cfg.write_text(self.RAG_YAML.format(enabled="true", top_k=3))
+        os.utime(cfg, (1_000_000, 1_000_000))
+
+        assert _load_rag_settings(str(temp_workspace)) == {"enabled": True, "top_k": 3}
+
+        cfg.write_text(self.RAG_YAML.format(enabled="false", top_k=9))
+        os.utime(cfg, (2_000_000, 2_000_000))
+
+        assert _load_rag_settings(str(temp_workspace)) == {"enabled": False, "top_k": 9}
+
+    @pytest.mark.unit
+    def test_parses_once_per_mtime(self, temp_workspace):
+        cfg = temp_workspace / "config" / "memory.yaml"
+        cfg.parent.mkdir()
+        cfg.write_text(self.RAG_YAML.format(enabled="true", top_k=4))
+
+        with patch("tools.parse_yaml", wraps=parse_yaml) as load:
+            first = _load_rag_settings(str(temp_workspace))
+            first["top_k"] = 100
+            second = _load_rag_settings(str(temp_workspace))
+
+        assert second == {"enabled": True, "top_k": 4}
+        assert load.call_count == 1
+
+    @pytest.mark.unit
+    def test_ignores_newer_json_sibling(self, temp_workspace):
+        cfg = temp_workspace / "config" / "memory.yaml"
+        cfg.parent.mkdir()
+        cfg.write_text(self.RAG_YAML.format(enabled="true", top_k=4))
+        os.utime(cfg, (1_000_000, 1_000_000))
+        (temp_workspace / "config" / "memory.json").write_text('{"memory": {}}')
+
+        assert _load_rag_settings(str(temp_workspace)) == {"enabled": True, "top_k": 4}
+
+
 class TestFormatResponseTool:
     """Tests for format_response_tool function."""
 
@@ -151,12 +558,12 @@ class TestToolIntegration:
     """Integration tests for tools working together."""
 
     @pytest.mark.integration
-    def test_search_and_format_workflow(self, mock_codebase):
+    def test_search_and_format_workflow(self, writable_codebase):
         """Test typical workflow: search then format."""
         # First, search the codebase
         search_result = search_codebase_tool(
             query="project structure",
-            workspace_root=str(mock_codebase)
+            workspace_root=str(writable_codebase)
         )
 
         # Then format the response
@@ -1,136 +1,393 @@
+import base64
+import functools
+import itertools
+import json
+import logging
 import os
-import glob
 import re
 import shutil
+import stat
 import subprocess
-import yaml
-from typing import List, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-from rag import OllamaEmbeddingProvider, Retriever, SimpleVectorStore
+from config_loader import parse_yaml
 
-def search_codebase_tool(query: str, focus_areas: List[str] = None, workspace_root: str = None) -> str:
+logger = logging.getLogger(__name__)
+
+
+def search_codebase_tool(
+    query: str, focus_areas: List[str] = None, workspace_root: str = None, regex: bool = False
+) -> str:
     """
     Searches the codebase for relevant files and snippets based on a query.
     Searches the user's current working directory, not the script location.
     For a general query like "what is this codebase", it will provide a file listing and README content.
+    The query is matched literally unless regex is true.
     """
     cwd = workspace_root or os.getcwd()
-    print(f"DEBUG: Searching {cwd} for query: '{query}' with focus areas: {focus_areas or 'all'}")
+    logger.debug("Searching %s for query: %r with focus areas: %s", cwd, query, focus_areas or "all")
 
     try:
-        # List files and directories from cwd, ignoring .git, venv, and __pycache__
-        all_files = glob.glob(os.path.join(cwd, "**/*"), recursive=True)
-        files = [
-            f for f in all_files
-            if ".git" not in f and "venv" not in f and "__pycache__" not in f
-        ]
-        # Limit the listing so we don't overwhelm downstream prompts
-        preview_files = files[:200]
+        if not query or not query.strip():
+            # Nothing to search for; the README and file listing still describe the project.
+            search_snippets = "No query provided."
+            rag_snippets, rag_error = "", "RAG skipped (empty query)."
+            direct_file_snippets = ""
+            preview_files, total_files, readme_path, complete = _list_workspace(cwd, _mtime_ns(cwd))
+        else:
+            rag_meta = _load_rag_settings(cwd)
+            # Listing, rg, RAG and direct-file reads are independent and mostly wait on
+            # subprocesses, HTTP and disk, so the call takes about as long as the slowest.
+            with ThreadPoolExecutor(max_workers=4) as pool:
+                listing = pool.submit(_list_workspace, cwd, _mtime_ns(cwd))
+                search = pool.submit(_search_snippets, query, cwd, focus_areas, regex)
+                direct = pool.submit(_gather_direct_file_snippets, query, cwd)
+                rag = pool.submit(_run_rag, query, cwd, rag_meta) if rag_meta.get("enabled") else None
+                preview_files, total_files, readme_path, complete = listing.result()
+                search_snippets = search.result() or "No direct matches found for the query."
+                direct_file_snippets = direct.result()
+                rag_snippets, rag_error = rag.result() if rag is not None else ("", None)
+
         file_list = "\n".join(preview_files)
-        if len(files) > len(preview_files):
-            file_list += f"\n... and {len(files) - len(preview_files)} more files"
+        if total_files > len(preview_files):
+            more = "" if complete else "more than "
+            file_list += f"\n... and {more}{total_files - len(preview_files)} more files"
 
         readme_content = ""
-        # Find and read README
-        readme_files = [f for f in files if "readme" in f.lower()]
-        if readme_files:
+        readme_path = _root_readme(cwd) or readme_path
+        if readme_path:
             try:
-                with open(readme_files[0], 'r') as f:
-                    readme_content = f.read()
+                readme_content = _read_readme(readme_path, _mtime_ns(readme_path)).decode("utf-8", "ignore")
             except Exception as e:
                 readme_content = f"Error reading README: {e}"
 
-        direct_file_snippets = _gather_direct_file_snippets(query, cwd)
-
-        search_snippets = ""
-        rag_snippets = ""
-        rag_meta = _load_rag_settings(cwd)
-        rag_error = None
-        if rag_meta.get("enabled"):
-            rag_snippets, rag_error = _run_rag(query, cwd, rag_meta)
-
-        if query:
-            rg_path = shutil.which("rg")
-            if rg_path:
-                search_dirs = focus_areas or [cwd]
-                snippet_lines = []
-                for area in search_dirs:
-                    area_path = os.path.join(cwd, area) if not os.path.isabs(area) else area
-                    if not os.path.exists(area_path):
-                        continue
-                    cmd = [
-                        rg_path,
-                        "--max-filesize", "1M",
-                        "--max-count", "5",
-                        "-n",
-                        "--context", "1",
-                        query,
-                        area_path,
-                    ]
-                    result = subprocess.run(
-                        cmd,
-                        capture_output=True,
-                        text=True,
-                    )
-                    if result.stdout.strip():
-                        snippet_lines.append(result.stdout.strip())
-                search_snippets = "\n\n".join(snippet_lines).strip()
-            else:
-                search_snippets = "ripgrep (`rg`) is not installed, so code search is unavailable."
-        if not search_snippets:
-            search_snippets = "No direct matches found for the query."
-
-        sections = [
-            f"## Query\n{query}",
-            "## Search Snippets\n" + (search_snippets or "No direct matches found for the query."),
-            "## RAG Snippets\n" + (rag_snippets or "RAG disabled or no matches found."),
-            "## RAG Status\n" + (rag_error or "RAG retrieval attempted."),
-            "## Direct File Snippets\n" + (direct_file_snippets or "No direct file references found in the query."),
-            "## README\n" + (readme_content or "No README file found."),
-            "## Project File Listing (partial)\n" + (file_list or "No files were listed."),
-        ]
-        return "\n\n".join(sections)
+        # One join over every piece, like format_response_tool, rather than a
+        # formatted string per section joined again at the end.
+        return "".join([
+            "## Query\n", query or "", "\n\n",
+            "## Search Snippets\n", search_snippets or "No direct matches found for the query.", "\n\n",
+            "## RAG Snippets\n", rag_snippets or "RAG disabled or no matches found.", "\n\n",
+            "## RAG Status\n", rag_error or "RAG retrieval attempted.", "\n\n",
+            "## Direct File Snippets\n",
+            direct_file_snippets or "No direct file references found in the query.", "\n\n",
+            "## README\n", readme_content or "No README file found.", "\n\n",
+            "## Project File Listing (partial)\n", file_list or "No files were listed.",
+        ])
     except Exception as e:
         return f"Error while analyzing codebase: {e}"
 
 
+MAX_LISTED_FILES = 200
+# Entries the os.walk fallback counts before giving up on an exact total.
+LISTING_COUNT_LIMIT = 10_000
+# Checked at the workspace root before falling back to the first README the listing saw.
+_README_NAMES = ("README.md", "README.rst", "README.txt", "README", "readme.md")
+# README text beyond this is cut off rather than fed into the prompt.
+README_MAX_BYTES = 65_536
+# Directory names never listed, matched against whole path components.
+_LISTING_SKIP_DIRS = frozenset({".git", ".venv", "venv", "__pycache__", "node_modules", "dist", "build"})
+
+
+def _iter_workspace(root: str) -> Iterator[Tuple[str, bool]]:
+    """Yield (path, is_dir) for everything under root, top-down and sorted.
+
+    Hidden entries are skipped, as glob does, and excluded directories are pruned
+    before descending so their contents are never stat'ed.
+    """
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames
+            if not d.startswith(".") and d not in _LISTING_SKIP_DIRS
+        )
+        for d in dirnames:
+            yield os.path.join(dirpath, d), True
+        for fname in sorted(filenames):
+            if not fname.startswith("."):
+                yield os.path.join(dirpath, fname), False
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+@functools.lru_cache(maxsize=8)
+def _list_workspace(
+    root: str, root_mtime_ns: Optional[int]
+) -> Tuple[Tuple[str, ...], int, Optional[str], bool]:
+    """Return (first MAX_LISTED_FILES paths, total count, first README path, complete) for root.
+
+    Uses `rg --files` when ripgrep is installed (files only, honouring .gitignore)
+    and the os.walk listing of files and directories otherwise. The walk stops
+    counting after LISTING_COUNT_LIMIT entries; complete is False when it did.
+
+    Keyed on the root directory's mtime, so adding or removing top-level entries
+    refreshes the listing; changes deeper in the tree show up once the root changes.
+    """
+    rg_files = _rg_list_files(root)
+    if rg_files is not None:
+        entries: Iterable[Tuple[str, bool]] = ((path, False) for path in rg_files)
+    else:
+        entries = _iter_workspace(root)
+    preview_files: List[str] = []
+    total_files = 0
+    readme_path = None
+    for path, is_dir in entries:
+        if rg_files is None and total_files >= LISTING_COUNT_LIMIT:
+            return tuple(preview_files), total_files, readme_path, False
+        total_files += 1
+        # Limit the listing so we don't overwhelm downstream prompts
+        if len(preview_files) < MAX_LISTED_FILES:
+            preview_files.append(path)
+        if readme_path is None and not is_dir and "readme" in os.path.basename(path).lower():
+            readme_path = path
+    return tuple(preview_files), total_files, readme_path, True
+
+
+def _rg_list_files(root: str) -> Optional[List[str]]:
+    """List files under root with rg's parallel, .gitignore-aware walker.
+
+    Paths come back shallowest first, so a top-level README is found before nested
+    ones. Returns None when rg is unavailable or fails, so callers can fall back
+    to _iter_workspace.
+    """
+    rg_path = shutil.which("rg")
+    if not rg_path:
+        return None
+    cmd = [rg_path, "--files"]
+    for name in sorted(_LISTING_SKIP_DIRS):
+        cmd.append(f"--glob=!{name}")
+    cmd.append(root)
+    try:
+        # stderr is never read, and the listing is decoded in one go rather than
+        # through a text-mode pipe.
+        result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    # Exit status 1 just means no files matched.
+    if result.returncode not in (0, 1):
+        return None
+    paths = result.stdout.decode("utf-8", errors="replace").splitlines()
+    return sorted(paths, key=lambda p: (p.count(os.sep), p))
+
+
+def _root_readme(root: str) -> Optional[str]:
+    """The workspace's top-level README under a conventional name, if any."""
+    for name in _README_NAMES:
+        path = os.path.join(root, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+@functools.lru_cache(maxsize=8)
+def _read_readme(path: str, mtime_ns: Optional[int]) -> bytes:
+    with open(path, "rb") as f:
+        return f.read(README_MAX_BYTES)
+
+
+def _search_snippets(query: str, cwd: str, focus_areas: Optional[List[str]], regex: bool) -> str:
+    """Content matches for query within the focus areas (default: the whole workspace)."""
+    rg_path = shutil.which("rg")
+    if not rg_path:
+        return "ripgrep (`rg`) is not installed, so code search is unavailable."
+    area_paths = [
+        os.path.normpath(os.path.join(cwd, area) if not os.path.isabs(area) else area)
+        for area in focus_areas or [cwd]
+    ]
+    area_paths = [p for p in dict.fromkeys(area_paths) if os.path.exists(p)]
+    # One rg process searches every area concurrently; drop areas nested in another
+    # so overlapping focus areas don't report the same matches twice.
+    roots = [
+        p for p in area_paths
+        if not any(p != other and p.startswith(other.rstrip(os.sep) + os.sep) for other in area_paths)
+    ]
+    return _run_ripgrep(rg_path, query, roots, regex=regex, timeout=_rg_timeout())
+
+
+# Wall-clock limit for one content search, so a huge tree or pathological pattern can't
+# stall the agent. ASK_RG_TIMEOUT overrides it.
+RG_TIMEOUT_SECONDS = 5
+# Files with matches, and characters per matched line, included in the snippets.
+RG_MAX_FILES = 50
+RG_MAX_LINE_CHARS = 300
+
+
+def _rg_timeout() -> float:
+    value = os.environ.get("ASK_RG_TIMEOUT")
+    if not value:
+        return RG_TIMEOUT_SECONDS
+    try:
+        timeout = float(value)
+    except ValueError:
+        timeout = 0
+    if timeout <= 0:
+        logger.warning("Ignoring invalid ASK_RG_TIMEOUT=%r", value)
+        return RG_TIMEOUT_SECONDS
+    return timeout
+
+
+def _run_ripgrep(
+    rg_path: str, query: str, paths: List[str], regex: bool = False, timeout: Optional[float] = None
+) -> str:
+    """Search every path in one rg process and return its matches as text.
+
+    rg already spreads one invocation over its own thread pool, so all focus
+    areas go into a single command rather than a process each. Queries are
+    fixed strings by default: the agent sends natural-language keywords, and a
+    literal lets rg skip regex compilation and use its memchr fast path.
+    """
+    if not paths:
+        return ""
+    if timeout is None:
+        timeout = RG_TIMEOUT_SECONDS
+    cmd = [
+        rg_path,
+        "--max-filesize", "1M",
+        "--max-count", "5",
+        "-n",
+        "--context", "1",
+        "--json",
+        "--no-messages",
+        "--mmap",
+    ]
+    if not regex:
+        cmd.append("--fixed-strings")
+    cmd += ["--", query, *paths]
+    timed_out = threading.Event()
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+
+        def expire() -> None:
+            timed_out.set()
+            proc.kill()
+
+        # Killing rg closes the pipe, so the reader below ends with whatever arrived in time.
+        timer = threading.Timer(timeout, expire)
+        timer.start()
+        try:
+            snippets, truncated = _format_rg_events(proc.stdout, RG_MAX_FILES)
+        finally:
+            timer.cancel()
+        if truncated:
+            proc.kill()  # enough files for the prompt; don't wait for the rest of the walk
+    if truncated:
+        snippets += f"\n\n(showing the first {RG_MAX_FILES} files with matches)"
+    elif timed_out.is_set():
+        note = f"(search timed out after {timeout:g}s; results may be incomplete)"
+        snippets = f"{snippets}\n\n{note}" if snippets else note
+    return snippets
+
+
+def _format_rg_events(stream: Iterable[bytes], max_files: Optional[int] = None) -> Tuple[str, bool]:
+    """Render rg --json match/context events as `path:line:text` / `path-line-text`, one block per file.
+
+    Once max_files blocks are complete, a match in another file stops reading; the flag
+    says whether that happened, so exactly max_files matching files is not truncation.
+    Lines longer than RG_MAX_LINE_CHARS (minified bundles, data files) are cut short.
+    """
+    blocks: List[str] = []
+    lines: List[str] = []
+    for raw in stream:
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            continue  # a line cut short when a timed-out rg was killed
+        kind = event.get("type")
+        if kind == "end":
+            if lines:
+                blocks.append("\n".join(lines))
+                lines = []
+            continue
+        if kind not in ("match", "context"):
+            continue
+        if max_files is not None and len(blocks) >= max_files:
+            return "\n\n".join(blocks), True
+        data = event["data"]
+        path = _rg_text(data["path"])
+        text = _rg_text(data["lines"]).rstrip("\n")
+        if len(text) > RG_MAX_LINE_CHARS:
+            text = text[:RG_MAX_LINE_CHARS] + " [...]"
+        sep = ":" if kind == "match" else "-"
+        lines.append(f"{path}{sep}{data['line_number']}{sep}{text}")
+    if lines:
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks), False
+
+
+def _rg_text(field: dict) -> str:
+    # rg reports non-UTF-8 paths and lines base64-encoded under "bytes".
+    if "text" in field:
+        return field["text"]
+    return base64.b64decode(field.get("bytes", "")).decode("utf-8", errors="replace")
+
+
+_DEFAULT_RAG_SETTINGS = {"enabled": True, "top_k": 6}
+
+
 def _load_rag_settings(cwd: str) -> dict:
     """Load rag profile metadata from config/memory.yaml if present.
 
     Defaults to enabled with top_k=6 when no config exists so RAG still works in
-    arbitrary workspaces.
+    arbitrary workspaces. The settings are cached until the file's mtime changes.
     """
     cfg_path = os.path.join(cwd, "config", "memory.yaml")
-    if not os.path.exists(cfg_path):
-        return {"enabled": True, "top_k": 6}
+    mtime_ns = _mtime_ns(cfg_path)
+    if mtime_ns is None:
+        return dict(_DEFAULT_RAG_SETTINGS)
+    return dict(_rag_settings(cfg_path, mtime_ns))
+
+
+@functools.lru_cache(maxsize=16)
+def _rag_settings(cfg_path: str, mtime_ns: int) -> dict:
     try:
-        with open(cfg_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or {}
+        # The user's own workspace file: plain YAML, never the package's compiled configs.
+        with open(cfg_path, "rb") as f:
+            data = parse_yaml(f.read()) or {}
         profiles = (data.get("memory") or {}).get("context_profiles") or []
         rag_profile = next((p for p in profiles if p.get("id") == "rag_profile"), None)
         if not rag_profile:
-            return {"enabled": True, "top_k": 6}
+            return _DEFAULT_RAG_SETTINGS
         meta = rag_profile.get("metadata") or {}
         return {
             "enabled": meta.get("rag_enabled", True),
             "top_k": int(meta.get("rag_top_k", 6)),
         }
     except Exception:
-        return {"enabled": True, "top_k": 6}
+        return _DEFAULT_RAG_SETTINGS
+
+
+# workspace root -> (index mtime_ns when last used, Retriever). Reusing the retriever keeps
+# its embedding HTTP session, loaded index and query cache; an index rewritten by another
+# process changes the mtime and gets a fresh one, which still inherits the embedder.
+_RETRIEVER_CACHE: Dict[str, Tuple[Optional[int], Any]] = {}
 
 
 def _run_rag(query: str, workspace_root: str, rag_meta: dict) -> Tuple[str, str]:
     if not query:
         return "", "RAG skipped (empty query)."
     try:
-        embedder = OllamaEmbeddingProvider()
+        # Resolved on first use: the RAG stack pulls in numpy and the HTTP client,
+        # which searches with RAG disabled never need.
+        from rag import OllamaEmbeddingProvider, Retriever, SimpleVectorStore
+
         store_path = os.path.join(workspace_root, ".agent_engine", "rag_index.json")
-        retriever = Retriever(
-            workspace_root=workspace_root,
-            embedder=embedder,
-            store=SimpleVectorStore(store_path),
-        )
+        cached = _RETRIEVER_CACHE.get(workspace_root)
+        if cached is not None and cached[0] == _mtime_ns(store_path):
+            retriever = cached[1]
+        else:
+            retriever = Retriever(
+                workspace_root=workspace_root,
+                # The embedder holds no index state, only the keep-alive session to Ollama.
+                embedder=cached[1].embedder if cached is not None else OllamaEmbeddingProvider(),
+                store=SimpleVectorStore(store_path),
+            )
         chunks = retriever.retrieve(query, top_k=rag_meta.get("top_k", 6))
+        # Recorded after retrieving so an index this retriever just built doesn't evict it.
+        _RETRIEVER_CACHE[workspace_root] = (_mtime_ns(store_path), retriever)
         if not chunks:
             return "No RAG matches found.", "RAG completed (no matches)."
         lines = []
@@ -141,12 +398,74 @@ def _run_rag(query: str, workspace_root: str, rag_meta: dict) -> Tuple[str, str]
         return "", f"RAG retrieval failed: {exc}"
 
 
+_TOKEN_RE = re.compile(r"[A-Za-z0-9_./:-]+")
+DIRECT_SNIPPET_MAX_LINES = 200
+# Same order of magnitude as rg's --max-filesize; bigger files are usually generated.
+DIRECT_SNIPPET_MAX_BYTES = 2_000_000
+DIRECT_SNIPPET_WORKERS = 8
+# Directories a bare file name in the query is also looked up under.
+_DIRECT_SNIPPET_ROOTS = ("src", "docs", "config", "tests")
+# Extensions that mark a slash-free token as a file name.
+_DIRECT_SNIPPET_SUFFIXES = (".py", ".md", ".yaml", ".yml", ".json", ".txt")
+
+
+def _numbered_head(path: str) -> Tuple[str, int]:
+    """Return the first DIRECT_SNIPPET_MAX_LINES lines of path, numbered, and how many there were.
+
+    Reading stops at the last kept line, so only those lines are ever decoded.
+    """
+    with open(path, "rb") as f:
+        lines = list(itertools.islice(f, DIRECT_SNIPPET_MAX_LINES))
+    numbered = [
+        f"{idx+1}: {line.decode('utf-8', errors='ignore').rstrip()}"
+        for idx, line in enumerate(lines)
+    ]
+    return "\n".join(numbered), len(lines)
+
+
+def _probe_and_read(path: str) -> Optional[Tuple[Tuple[int, int], Optional[Tuple[str, int]]]]:
+    """Return ((st_dev, st_ino), numbered head or None if unreadable) for a file; None if path is not one."""
+    # One stat answers existence, file type, identity and size.
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    key = (st.st_dev, st.st_ino)
+    if st.st_size > DIRECT_SNIPPET_MAX_BYTES:
+        return key, None
+    try:
+        return key, _numbered_head(path)
+    except Exception:
+        return key, None
+
+
 def _gather_direct_file_snippets(query: str, workspace_root: str) -> str:
     """If the query names files/paths, read and return small snippets."""
-    tokens = re.findall(r"[A-Za-z0-9_./:-]+", query)
-    seen = set()
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return ""
+    seen: Set[Tuple[int, int]] = set()
     snippets: List[str] = []
-    default_roots = ["src", "docs", "config", "tests"]
+
+    # Also consider combined tokens like "src/agent_engine/" + "runtime/context.py",
+    # built in one pass over adjacent pairs rather than by growing `tokens` in place.
+    tokens += [
+        tok.rstrip("/") + "/" + nxt.lstrip("/")
+        for tok, nxt in zip(tokens, tokens[1:])
+        if tok.endswith("/")
+    ]
+
+    file_tokens = [
+        tok for tok in tokens
+        if "/" in tok or tok.endswith(_DIRECT_SNIPPET_SUFFIXES)
+    ]
+    # Check the default roots once, rather than probing missing ones for every token.
+    present_roots = [
+        root for root in _DIRECT_SNIPPET_ROOTS
+        if os.path.isdir(os.path.join(workspace_root, root))
+    ] if file_tokens else []
 
     def candidate_paths(tok: str) -> List[str]:
         cands = []
@@ -154,56 +473,51 @@ def _gather_direct_file_snippets(query: str, workspace_root: str) -> str:
             cands.append(tok)
         else:
             cands.append(os.path.join(workspace_root, tok))
-            for root in default_roots:
+            for root in present_roots:
                 cands.append(os.path.join(workspace_root, root, tok.lstrip("/")))
         return cands
 
-    # Also consider combined tokens like "src/agent_engine/" + "runtime/context.py"
-    for i, tok in enumerate(tokens):
-        if i + 1 < len(tokens) and tok.endswith("/"):
-            combined = tok.rstrip("/") + "/" + tokens[i + 1].lstrip("/")
-            tokens.append(combined)
-
-    for tok in tokens:
-        if "/" in tok or tok.endswith((".py", ".md", ".yaml", ".yml", ".json", ".txt")):
-            for cand in candidate_paths(tok):
-                if os.path.isdir(cand) or not os.path.exists(cand):
+    wanted = [candidate_paths(tok) for tok in file_tokens]
+    flat = [cand for cands in wanted for cand in cands]
+    if flat:
+        # Probing and reading are independent per candidate, so do them all up
+        # front across threads; the ordered pass below keeps the first hit per token.
+        with ThreadPoolExecutor(max_workers=min(DIRECT_SNIPPET_WORKERS, len(flat))) as pool:
+            probed = iter(pool.map(_probe_and_read, flat))
+        for cands in wanted:
+            results = [next(probed) for _ in cands]
+            for cand, result in zip(cands, results):
+                if result is None:
                     continue
-                real = os.path.realpath(cand)
-                if real in seen:
+                key, head = result
+                # (device, inode) identifies the file however the token spelled its path
+                if key in seen:
                     continue
-                seen.add(real)
-                try:
-                    with open(real, "r", encoding="utf-8", errors="ignore") as f:
-                        lines = f.readlines()
-                    numbered = [f"{idx+1}: {line.rstrip()}" for idx, line in enumerate(lines[:200])]
-                    excerpt = "\n".join(numbered)
-                    rel = os.path.relpath(real, workspace_root)
-                    snippets.append(f"{rel}:1-{min(len(lines),200)}\n{excerpt}")
-                    break
-                except Exception:
+                seen.add(key)
+                if head is None:
                     continue
+                excerpt, n_lines = head
+                rel = os.path.relpath(os.path.realpath(cand), workspace_root)
+                snippets.append(f"{rel}:1-{n_lines}\n{excerpt}")
+                break
     # Heuristic fallback: if nothing found and query mentions context/RAG, pull the main context file
     if not snippets and any(k in query.lower() for k in ["context", "rag", "retrieval"]):
         fallback = os.path.join(workspace_root, "src", "agent_engine", "runtime", "context.py")
-        if os.path.exists(fallback):
-            try:
-                with open(fallback, "r", encoding="utf-8", errors="ignore") as f:
-                    lines = f.readlines()
-                numbered = [f"{idx+1}: {line.rstrip()}" for idx, line in enumerate(lines[:200])]
-                excerpt = "\n".join(numbered)
-                rel = os.path.relpath(fallback, workspace_root)
-                snippets.append(f"{rel}:1-{min(len(lines),200)}\n{excerpt}")
-            except Exception:
-                pass
+        fallback_hit = _probe_and_read(fallback)
+        if fallback_hit is not None and fallback_hit[1] is not None:
+            excerpt, n_lines = fallback_hit[1]
+            rel = os.path.relpath(fallback, workspace_root)
+            snippets.append(f"{rel}:1-{n_lines}\n{excerpt}")
     return "\n\n".join(snippets)
 
 def format_response_tool(original_question: str, analysis: str, code_snippets: str, workspace_root: str = None) -> str:
     """
     Formats the analyzed question and code snippets into a coherent answer for the user.
     """
-    print(f"DEBUG: Formatting response for question: '{original_question}' (workspace: {workspace_root or 'cwd'})")
-    response = f"## Your Question:\n{original_question}\n\n"
-    response += f"## Agent Analysis:\n{analysis}\n\n"
-    response += f"## Relevant Code/Information:\n{code_snippets}\n\n"
-    return response
+    logger.debug("Formatting response for question: %r (workspace: %s)", original_question, workspace_root or "cwd")
+    # Built in one pass: code_snippets is usually a full search_codebase_tool result.
+    return "".join([
+        "## Your Question:\n", original_question, "\n\n",
+        "## Agent Analysis:\n", analysis, "\n\n",
+        "## Relevant Code/Information:\n", code_snippets, "\n\n",
+    ])